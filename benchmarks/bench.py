@@ -0,0 +1,308 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of Invenio.
+# Copyright (C) 2020 CERN.
+#
+# Invenio is free software; you can redistribute it and/or modify it
+# under the terms of the MIT License; see LICENSE file for more details.
+
+"""Microbenchmarks of the formatter hot paths.
+
+Each benchmark reports the best time per call over several rounds, and the
+peak memory allocated by one call (measured with :mod:`tracemalloc`).
+
+Run all the benchmarks, or only those matching a pattern:
+
+.. code-block:: console
+
+   $ python benchmarks/bench.py
+   $ python benchmarks/bench.py -k badge
+
+Save a new baseline, or compare with the committed one and fail on
+regressions beyond a threshold (25% by default):
+
+.. code-block:: console
+
+   $ python benchmarks/bench.py --save benchmarks/baseline.json
+   $ python benchmarks/bench.py --compare benchmarks/baseline.json
+
+Timings depend on the machine: compare with a baseline saved on the same
+machine.
+"""
+
+from __future__ import absolute_import, print_function
+
+import argparse
+import datetime
+import fnmatch
+import gc
+import json
+import sys
+import time
+import tracemalloc
+
+import arrow
+from flask import Flask
+
+from invenio_formatter import InvenioFormatter
+from invenio_formatter.context_processors.badges import generate_badge_png, \
+    generate_badge_svg, get_text_length
+from invenio_formatter.filters.datetime import format_arrow, from_isodate, \
+    from_isodatetime
+from invenio_formatter.filters.html import sanitize_html
+
+BENCHMARKS = []
+"""Registered benchmarks, as ``(name, setup)`` pairs."""
+
+
+def benchmark(name):
+    """Register a benchmark.
+
+    The decorated function prepares the benchmark and returns the function
+    to measure, called without arguments.
+    """
+    def decorator(setup):
+        BENCHMARKS.append((name, setup))
+        return setup
+    return decorator
+
+
+def create_app(**config):
+    """Create an application with the formatter."""
+    app = Flask('benchmarks')
+    app.config.update(
+        ALLOWED_HTML_TAGS=['a', 'b', 'em', 'p'],
+        ALLOWED_HTML_ATTRS={'a': ['href']},
+        **config
+    )
+    InvenioFormatter(app)
+    return app
+
+
+def html_document(size):
+    """Create an HTML document of about ``size`` bytes."""
+    paragraph = (
+        '<p>Some <b>bold</b> and <em>emphasized</em> text with a '
+        '<a href="https://example.org" onclick="evil()">link</a>, an '
+        '<img src="x" onerror="evil()"> image and a '
+        '<script>evil()</script> script.</p>\n'
+    )
+    return paragraph * max(1, size // len(paragraph))
+
+
+@benchmark('get_text_length')
+def bench_get_text_length():
+    """Measure a title and a DOI."""
+    return lambda: get_text_length('DOI', '10.5281/zenodo.1234567')
+
+
+@benchmark('generate_badge_svg')
+def bench_generate_badge_svg():
+    """Generate an SVG badge."""
+    return lambda: generate_badge_svg('DOI', '10.5281/zenodo.1234567')
+
+
+@benchmark('generate_badge_png')
+def bench_generate_badge_png():
+    """Generate a PNG badge."""
+    return lambda: generate_badge_png('DOI', '10.5281/zenodo.1234567')
+
+
+def bench_view(path, **config):
+    """Request a badge through the test client."""
+    client = create_app(**config).test_client()
+    return lambda: client.get(path)
+
+
+@benchmark('view_badge_svg_cached')
+def bench_view_badge_svg_cached():
+    """Request a cached SVG badge."""
+    return bench_view('/badge/DOI/10.5281/zenodo.1234567.svg')
+
+
+@benchmark('view_badge_svg')
+def bench_view_badge_svg():
+    """Request an SVG badge, rendered on each request."""
+    return bench_view('/badge/DOI/10.5281/zenodo.1234567.svg',
+                      FORMATTER_BADGES_CACHE_MAX_ENTRIES=0)
+
+
+@benchmark('view_badge_png')
+def bench_view_badge_png():
+    """Request a PNG badge, rendered on each request."""
+    return bench_view('/badge/DOI/10.5281/zenodo.1234567.png',
+                      FORMATTER_BADGES_CACHE_MAX_ENTRIES=0)
+
+
+@benchmark('from_isodate')
+def bench_from_isodate():
+    """Parse an ISO date."""
+    return lambda: from_isodate('2020-06-01')
+
+
+@benchmark('from_isodatetime')
+def bench_from_isodatetime():
+    """Parse an ISO datetime."""
+    return lambda: from_isodatetime('2020-06-01T12:34:56.789+02:00')
+
+
+@benchmark('from_isodate_arrow')
+def bench_from_isodate_arrow():
+    """Parse an ISO date with arrow, the reference of from_isodate."""
+    return lambda: arrow.get('2020-06-01').date()
+
+
+@benchmark('from_isodatetime_arrow')
+def bench_from_isodatetime_arrow():
+    """Parse an ISO datetime with arrow, the reference of from_isodatetime."""
+    return lambda: arrow.get('2020-06-01T12:34:56.789+02:00').datetime
+
+
+@benchmark('format_arrow')
+def bench_format_arrow():
+    """Format an arrow datetime."""
+    value = arrow.get(datetime.datetime(2020, 6, 1, 12, 34, 56))
+    return lambda: format_arrow(value, 'YYYY-MM-DD HH:mm:ss')
+
+
+@benchmark('format_arrow_arrow')
+def bench_format_arrow_arrow():
+    """Format an arrow datetime with arrow, the reference of format_arrow."""
+    value = arrow.get(datetime.datetime(2020, 6, 1, 12, 34, 56))
+    return lambda: value.format('YYYY-MM-DD HH:mm:ss')
+
+
+def bench_sanitize_html(size):
+    """Sanitize an HTML document."""
+    value = html_document(size)
+    app = create_app()
+
+    def run():
+        with app.app_context():
+            sanitize_html(value)
+    return run
+
+
+benchmark('sanitize_html_small')(lambda: bench_sanitize_html(200))
+benchmark('sanitize_html_medium')(lambda: bench_sanitize_html(20 * 1024))
+benchmark('sanitize_html_large')(
+    lambda: bench_sanitize_html(2 * 1024 * 1024))
+
+
+def measure(func, min_time=0.2, rounds=5):
+    """Measure a function.
+
+    :param func: The function, called without arguments.
+    :param min_time: Minimum duration of a round in seconds.
+    :param rounds: Number of rounds, fewer for calls slower than a second.
+    :returns: A dictionary with the best ``time`` per call in seconds, the
+        number of ``calls`` per round and the peak memory ``allocated`` by a
+        call in bytes.
+    """
+    # Warm up, and calibrate the number of calls per round.
+    start = time.perf_counter()
+    func()
+    elapsed = time.perf_counter() - start
+    calls = max(1, int(min_time / elapsed) if elapsed else 1000)
+    if elapsed > 1:
+        rounds = max(1, min(rounds, int(5 / elapsed)))
+
+    best = None
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        for _ in range(rounds):
+            start = time.perf_counter()
+            for _ in range(calls):
+                func()
+            elapsed = (time.perf_counter() - start) / calls
+            best = elapsed if best is None else min(best, elapsed)
+    finally:
+        if gc_enabled:
+            gc.enable()
+
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        func()
+        allocated = tracemalloc.get_traced_memory()[1] - before
+    finally:
+        tracemalloc.stop()
+    return dict(time=best, calls=calls, allocated=allocated)
+
+
+def compare(results, baseline, threshold):
+    """Compare results with a baseline.
+
+    :returns: The names of the benchmarks slower, or allocating more, than
+        the baseline by more than ``threshold``.
+    """
+    regressions = []
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+        for metric in ('time', 'allocated'):
+            reference = baseline[name][metric]
+            if reference and result[metric] > reference * (1 + threshold):
+                regressions.append('{0} ({1} {2:+.0%})'.format(
+                    name, metric, result[metric] / reference - 1))
+    return regressions
+
+
+def format_time(seconds):
+    """Format a duration."""
+    for unit, factor in (('s', 1), ('ms', 1e3), ('us', 1e6)):
+        if seconds * factor >= 1:
+            return '{0:.2f} {1}'.format(seconds * factor, unit)
+    return '{0:.0f} ns'.format(seconds * 1e9)
+
+
+def main(argv=None):
+    """Run the benchmarks."""
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('-k', dest='pattern', default='*',
+                        help='Run the benchmarks matching a glob pattern.')
+    parser.add_argument('--rounds', type=int, default=5)
+    parser.add_argument('--min-time', type=float, default=0.2,
+                        help='Minimum duration of a round in seconds.')
+    parser.add_argument('--save', metavar='FILE',
+                        help='Save the results as a baseline.')
+    parser.add_argument('--compare', metavar='FILE',
+                        help='Compare with a baseline.')
+    parser.add_argument('--threshold', type=float, default=0.25,
+                        help='Tolerated regression (default: 0.25).')
+    args = parser.parse_args(argv)
+
+    baseline = {}
+    if args.compare:
+        with open(args.compare) as fp:
+            baseline = json.load(fp)
+
+    results = {}
+    print('{0:<24} {1:>12} {2:>12} {3:>10}'.format(
+        'benchmark', 'time', 'allocated', 'baseline'))
+    for name, setup in BENCHMARKS:
+        if not fnmatch.fnmatch(name, args.pattern):
+            continue
+        result = results[name] = measure(
+            setup(), min_time=args.min_time, rounds=args.rounds)
+        reference = baseline.get(name)
+        print('{0:<24} {1:>12} {2:>10.1f}kB {3:>10}'.format(
+            name, format_time(result['time']), result['allocated'] / 1024.,
+            '{0:+.0%}'.format(result['time'] / reference['time'] - 1)
+            if reference else ''))
+
+    if args.save:
+        with open(args.save, 'w') as fp:
+            json.dump(results, fp, indent=2, sort_keys=True)
+            fp.write('\n')
+
+    regressions = compare(results, baseline, args.threshold)
+    for regression in regressions:
+        print('Regression: {0}'.format(regression), file=sys.stderr)
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,247 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of Invenio.
+# Copyright (C) 2020 CERN.
+#
+# Invenio is free software; you can redistribute it and/or modify it
+# under the terms of the MIT License; see LICENSE file for more details.
+
+"""Load test of the badge endpoint.
+
+Starts an application using Invenio-Formatter on a local server (the example
+application by default), or targets a running server with ``--url``, and
+drives the ``/badge/...`` routes at several concurrency levels with a mix of:
+
+- hot badges (a few values requested again and again) and cold badges
+  (values never requested before);
+- SVG and PNG badges;
+- conditional requests, sending the ETag of a previous response.
+
+It reports the throughput and the latency percentiles of each level:
+
+.. code-block:: console
+
+   $ python benchmarks/loadtest.py --concurrency 1,8,32 --duration 10
+   $ python benchmarks/loadtest.py --app mysite.wsgi:application
+   $ python benchmarks/loadtest.py --url http://badges.example.org
+
+The request mix is drawn from a seeded random generator, so runs are
+reproducible (cold values are made unique to each run). The local server is
+Werkzeug's threaded server, which is convenient but slower than a production
+WSGI server: use ``--url`` to size production servers.
+"""
+
+from __future__ import absolute_import, print_function
+
+import argparse
+import http.client
+import importlib
+import itertools
+import multiprocessing
+import os
+import random
+import runpy
+import socket
+import sys
+import threading
+import time
+from collections import Counter
+from urllib.parse import urlsplit
+
+EXAMPLE_APP = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), '..', 'examples', 'app.py')
+
+
+def load_app(spec):
+    """Load a WSGI application.
+
+    :param spec: A ``path/to/file.py`` defining ``app``, or a
+        ``module:attribute`` import string.
+    :returns: The application.
+    """
+    if spec.endswith('.py'):
+        directory = os.path.dirname(os.path.abspath(spec))
+        sys.path.insert(0, directory)
+        os.chdir(directory)
+        return runpy.run_path(spec)['app']
+    module, _, attribute = spec.partition(':')
+    return getattr(importlib.import_module(module), attribute or 'app')
+
+
+def serve(spec, port, ready):
+    """Serve an application, in a separate process."""
+    from werkzeug.serving import WSGIRequestHandler, make_server
+
+    class QuietRequestHandler(WSGIRequestHandler):
+        def log_request(self, *args, **kwargs):
+            pass
+
+    server = make_server('127.0.0.1', port, load_app(spec), threaded=True,
+                         request_handler=QuietRequestHandler)
+    ready.set()
+    server.serve_forever()
+
+
+def free_port():
+    """Get a free local port."""
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+class Workload(object):
+    """Generate the badge requests."""
+
+    def __init__(self, title, hot_keys, cold_ratio, png_ratio,
+                 conditional_ratio, seed):
+        """Initialize the workload.
+
+        :param title: The badge title.
+        :param hot_keys: Number of hot badge values.
+        :param cold_ratio: Ratio of requests for never requested values.
+        :param png_ratio: Ratio of PNG badges.
+        :param conditional_ratio: Ratio of requests sending the ETag of a
+            previous response, if any.
+        :param seed: Seed of the random generator.
+        """
+        self.title = title
+        self.hot_keys = hot_keys
+        self.cold_ratio = cold_ratio
+        self.png_ratio = png_ratio
+        self.conditional_ratio = conditional_ratio
+        self.etags = {}
+        self._random = random.Random(seed)
+        self._cold = itertools.count()
+        # Cold values must be new to a server which already served a run.
+        self._run = '{0:x}'.format(int(time.time() * 1000))
+        self._lock = threading.Lock()
+
+    def next_request(self):
+        """Get the path and headers of the next request."""
+        with self._lock:
+            if self._random.random() < self.cold_ratio:
+                value = '10.5281/cold.{0}.{1}'.format(
+                    self._run, next(self._cold))
+            else:
+                value = '10.5281/hot.{0}'.format(
+                    self._random.randrange(self.hot_keys))
+            ext = 'png' if self._random.random() < self.png_ratio else 'svg'
+            conditional = self._random.random() < self.conditional_ratio
+        path = '/badge/{0}/{1}.{2}'.format(self.title, value, ext)
+        headers = {}
+        etag = self.etags.get(path)
+        if conditional and etag:
+            headers['If-None-Match'] = etag
+        return path, headers
+
+
+def run_level(url, workload, concurrency, duration):
+    """Drive the server with concurrent clients for a while.
+
+    :returns: The latencies in seconds, the status counts and the errors.
+    """
+    target = urlsplit(url)
+    prefix = target.path.rstrip('/')
+    deadline = time.monotonic() + duration
+    latencies, statuses, errors = [], Counter(), Counter()
+    lock = threading.Lock()
+
+    def client():
+        connection = http.client.HTTPConnection(
+            target.hostname, target.port or 80, timeout=30)
+        local_latencies, local_statuses = [], Counter()
+        while time.monotonic() < deadline:
+            path, headers = workload.next_request()
+            start = time.perf_counter()
+            try:
+                connection.request('GET', prefix + path, headers=headers)
+                response = connection.getresponse()
+                response.read()
+            except (OSError, http.client.HTTPException) as e:
+                connection.close()
+                with lock:
+                    errors[type(e).__name__] += 1
+                continue
+            local_latencies.append(time.perf_counter() - start)
+            local_statuses[response.status] += 1
+            etag = response.getheader('ETag')
+            if etag:
+                workload.etags[path] = etag
+        connection.close()
+        with lock:
+            latencies.extend(local_latencies)
+            statuses.update(local_statuses)
+
+    threads = [threading.Thread(target=client) for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return latencies, statuses, errors
+
+
+def percentile(values, ratio):
+    """Get a percentile of sorted values (nearest rank)."""
+    if not values:
+        return float('nan')
+    return values[min(len(values) - 1, int(ratio * len(values)))]
+
+
+def main(argv=None):
+    """Run the load test."""
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--app', default=EXAMPLE_APP,
+                        help='Application file or module:attribute to serve '
+                             '(default: the example application).')
+    parser.add_argument('--url', help='Target a running server instead.')
+    parser.add_argument('--title', default='DOI', help='Badge title.')
+    parser.add_argument('--concurrency', default='1,4,16,64',
+                        help='Comma-separated concurrency levels.')
+    parser.add_argument('--duration', type=float, default=10,
+                        help='Seconds per concurrency level.')
+    parser.add_argument('--hot-keys', type=int, default=50)
+    parser.add_argument('--cold-ratio', type=float, default=0.1)
+    parser.add_argument('--png-ratio', type=float, default=0.3)
+    parser.add_argument('--conditional-ratio', type=float, default=0.3)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    server = None
+    url = args.url
+    if not url:
+        port = free_port()
+        ready = multiprocessing.Event()
+        server = multiprocessing.Process(
+            target=serve, args=(args.app, port, ready), daemon=True)
+        server.start()
+        if not ready.wait(30):
+            parser.error('The application did not start.')
+        url = 'http://127.0.0.1:{0}'.format(port)
+
+    workload = Workload(args.title, args.hot_keys, args.cold_ratio,
+                        args.png_ratio, args.conditional_ratio, args.seed)
+    print('{0:>11} {1:>9} {2:>9} {3:>9} {4:>9} {5:>7}  {6}'.format(
+        'concurrency', 'req/s', 'p50 ms', 'p95 ms', 'p99 ms', 'errors',
+        'statuses'))
+    try:
+        for concurrency in map(int, args.concurrency.split(',')):
+            latencies, statuses, errors = run_level(
+                url, workload, concurrency, args.duration)
+            latencies.sort()
+            print('{0:>11} {1:>9.1f} {2:>9.2f} {3:>9.2f} {4:>9.2f} {5:>7} '
+                  ' {6}'.format(
+                      concurrency, len(latencies) / args.duration,
+                      percentile(latencies, 0.50) * 1000,
+                      percentile(latencies, 0.95) * 1000,
+                      percentile(latencies, 0.99) * 1000,
+                      sum(errors.values()),
+                      ' '.join('{0}:{1}'.format(*item)
+                               for item in sorted(statuses.items()))))
+    finally:
+        if server is not None:
+            server.terminate()
+            server.join()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of Invenio.
+# Copyright (C) 2020 CERN.
+#
+# Invenio is free software; you can redistribute it and/or modify it
+# under the terms of the MIT License; see LICENSE file for more details.
+
+"""Admission control of the badges rendered by the badge views."""
+
+from __future__ import absolute_import, print_function
+
+from contextlib import contextmanager
+from threading import BoundedSemaphore, Lock
+
+
+class RenderRejected(Exception):
+    """Raised when a badge cannot be rendered because of the load."""
+
+
+class RenderAdmission(object):
+    """Limit the number of badges rendered at once by a process.
+
+    Renders beyond the limit wait in a short queue, and are rejected with
+    :exc:`RenderRejected` when the queue is full or when they waited too
+    long, so that overloaded workers answer quickly instead of piling up
+    requests.
+    """
+
+    def __init__(self, max_renders, max_queued=8, timeout=0.5):
+        """Initialize the admission control.
+
+        :param max_renders: Maximum number of badges rendered at once, or
+            ``0`` for no limit.
+        :param max_queued: Maximum number of renders waiting for a slot.
+            (Default: ``8``)
+        :param timeout: Seconds a render waits for a slot. (Default: ``0.5``)
+        """
+        self.max_renders = max_renders
+        self.max_queued = max_queued
+        self.timeout = timeout
+        self.admitted = 0
+        self.queued = 0
+        self.rejected = 0
+        self.timeouts = 0
+        self.too_long = 0
+        self._slots = BoundedSemaphore(max_renders)
+        self._lock = Lock()
+        self._waiting = 0
+
+    @contextmanager
+    def slot(self):
+        """Hold a render slot.
+
+        :raises RenderRejected: If no slot is available in time.
+        """
+        if not self.max_renders:
+            self.admitted += 1
+            yield
+            return
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                if self._waiting >= self.max_queued:
+                    self.rejected += 1
+                    raise RenderRejected()
+                self._waiting += 1
+                self.queued += 1
+            try:
+                acquired = self._slots.acquire(timeout=self.timeout)
+            finally:
+                with self._lock:
+                    self._waiting -= 1
+            if not acquired:
+                self.timeouts += 1
+                raise RenderRejected()
+        self.admitted += 1
+        try:
+            yield
+        finally:
+            self._slots.release()
+
+    @property
+    def stats(self):
+        """Get the admission counters."""
+        return dict(
+            admitted=self.admitted,
+            queued=self.queued,
+            rejected=self.rejected,
+            timeouts=self.timeouts,
+            too_long=self.too_long,
+        )
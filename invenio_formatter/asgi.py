@@ -0,0 +1,137 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of Invenio.
+# Copyright (C) 2020 CERN.
+#
+# Invenio is free software; you can redistribute it and/or modify it
+# under the terms of the MIT License; see LICENSE file for more details.
+
+"""ASGI application serving the badges.
+
+The application answers the badge routes of a Flask application (same URLs
+and headers as the badge blueprint) from an ASGI server, without blocking
+the event loop: the badges are rendered in an executor, and concurrent
+identical requests share a single rendering. Other paths get a 404.
+
+.. code-block:: python
+
+    from invenio_formatter.asgi import BadgeASGIApp
+
+    badges = BadgeASGIApp(create_app())
+
+.. code-block:: console
+
+   $ uvicorn myapp:badges
+"""
+
+from __future__ import absolute_import, print_function
+
+import asyncio
+
+from werkzeug.exceptions import HTTPException, NotFound
+from werkzeug.test import EnvironBuilder
+from werkzeug.wrappers import Response
+
+BADGE_ENDPOINTS = ('invenio_formatter_badges.badge',
+                   'invenio_formatter_badges.badges')
+"""Endpoints served by :class:`BadgeASGIApp`."""
+
+SHARED_HEADERS = ('accept', 'accept-encoding', 'if-none-match',
+                  'if-modified-since')
+"""Request headers which must be equal for requests to share a response."""
+
+
+class BadgeASGIApp(object):
+    """ASGI application serving the badge routes of a Flask application."""
+
+    def __init__(self, app, executor=None):
+        """Initialize the application.
+
+        :param app: The Flask application, with the badge blueprint.
+        :param executor: The :class:`concurrent.futures.Executor` rendering
+            the badges, or ``None`` for the default executor of the event
+            loop. (Default: ``None``)
+        """
+        self.app = app
+        self.executor = executor
+        self.renders = 0
+        self.shared = 0
+        self._pending = {}
+
+    async def __call__(self, scope, receive, send):
+        """Handle an ASGI connection."""
+        if scope['type'] == 'lifespan':
+            while True:
+                message = await receive()
+                if message['type'] == 'lifespan.startup':
+                    await send({'type': 'lifespan.startup.complete'})
+                elif message['type'] == 'lifespan.shutdown':
+                    await send({'type': 'lifespan.shutdown.complete'})
+                    return
+        if scope['type'] != 'http':
+            return
+
+        headers = {}
+        for name, value in scope['headers']:
+            name = name.decode('latin-1').lower()
+            value = value.decode('latin-1')
+            headers[name] = '{0}, {1}'.format(headers[name], value) \
+                if name in headers else value
+        key = (scope['method'], scope['path'], scope['query_string']) + \
+            tuple(headers.get(name) for name in SHARED_HEADERS)
+
+        future = self._pending.get(key)
+        if future is None:
+            loop = asyncio.get_running_loop()
+            future = loop.run_in_executor(
+                self.executor, self._respond, scope, headers)
+            self._pending[key] = future
+            future.add_done_callback(lambda _: self._pending.pop(key, None))
+            self.renders += 1
+        else:
+            self.shared += 1
+        status, response_headers, body = await asyncio.shield(future)
+
+        await send({
+            'type': 'http.response.start',
+            'status': status,
+            'headers': response_headers,
+        })
+        await send({'type': 'http.response.body', 'body': body})
+
+    def _respond(self, scope, headers):
+        """Run a badge request through the Flask application.
+
+        :returns: The status, the ASGI headers and the body of the response.
+        """
+        server = scope.get('server') or ('localhost', 80)
+        builder = EnvironBuilder(
+            path=scope['path'],
+            base_url='{0}://{1}{2}'.format(
+                scope.get('scheme', 'http'),
+                headers.get('host', '{0}:{1}'.format(*server)),
+                scope.get('root_path', ''),
+            ),
+            query_string=scope['query_string'].decode('latin-1'),
+            method=scope['method'],
+            headers=headers,
+        )
+        environ = builder.get_environ()
+        builder.close()
+
+        adapter = self.app.url_map.bind_to_environ(environ)
+        try:
+            endpoint, _ = adapter.match()
+        except HTTPException as e:
+            response = e.get_response(environ)
+        else:
+            if endpoint in BADGE_ENDPOINTS:
+                response = Response.from_app(self.app.wsgi_app, environ,
+                                             buffered=True)
+            else:
+                response = NotFound().get_response(environ)
+        body = b'' if scope['method'] == 'HEAD' else response.get_data()
+        return response.status_code, [
+            (name.lower().encode('latin-1'), value.encode('latin-1'))
+            for name, value in response.headers.items()
+        ], body
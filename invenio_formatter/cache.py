@@ -0,0 +1,195 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of Invenio.
+# Copyright (C) 2020 CERN.
+#
+# Invenio is free software; you can redistribute it and/or modify it
+# under the terms of the MIT License; see LICENSE file for more details.
+
+"""In-process caches."""
+
+from __future__ import absolute_import, print_function
+
+from collections import OrderedDict
+from threading import Event, Lock
+
+_missing = object()
+
+
+def sizeof(value):
+    """Get the size in bytes of a value, UTF-8 encoding strings."""
+    if isinstance(value, str):
+        return len(value.encode('utf-8'))
+    return len(value)
+
+
+class LRUCache(object):
+    """Thread-safe least recently used cache bounded in entries and size.
+
+    The size of an entry is given by ``sizeof`` (its length in bytes by
+    default), so that a cache of rendered badges can be bounded in bytes.
+    Entries larger than ``max_bytes`` are never stored.
+    """
+
+    def __init__(self, max_entries=1024, max_bytes=None, sizeof=sizeof):
+        """Initialize the cache.
+
+        :param max_entries: Maximum number of entries. ``0`` disables the
+            cache.
+        :param max_bytes: Maximum total size of the entries, or ``None`` for
+            no limit. (Default: ``None``)
+        :param sizeof: Function returning the size of a value.
+            (Default: :func:`sizeof`)
+        """
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof
+        self._data = OrderedDict()
+        self._lock = Lock()
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        """Get the number of entries."""
+        return len(self._data)
+
+    def __contains__(self, key):
+        """Check if a key is cached, without touching the LRU order."""
+        return key in self._data
+
+    def get(self, key, default=None):
+        """Get a value and mark it as recently used.
+
+        :param key: The cache key.
+        :param default: Value returned on a miss. (Default: ``None``)
+        :returns: The cached value or ``default``.
+        """
+        with self._lock:
+            try:
+                value = self._data[key][0]
+            except KeyError:
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value):
+        """Store a value, evicting the least recently used entries.
+
+        :param key: The cache key.
+        :param value: The value to store.
+        """
+        if not self.max_entries:
+            return
+        size = self.sizeof(value)
+        if self.max_bytes is not None and size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._data:
+                self.size -= self._data.pop(key)[1]
+            self._data[key] = (value, size)
+            self.size += size
+            while len(self._data) > self.max_entries or (
+                    self.max_bytes is not None and
+                    self.size > self.max_bytes):
+                self.size -= self._data.popitem(last=False)[1][1]
+                self.evictions += 1
+
+    def get_or_set(self, key, factory):
+        """Get a value, computing and storing it on a miss.
+
+        :param key: The cache key.
+        :param factory: Function called without arguments on a miss.
+        :returns: The cached or computed value.
+        """
+        value = self.get(key, _missing)
+        if value is _missing:
+            value = factory()
+            self.set(key, value)
+        return value
+
+    def clear(self):
+        """Remove all entries and reset the counters."""
+        with self._lock:
+            self._data.clear()
+            self.size = self.hits = self.misses = self.evictions = 0
+
+    @property
+    def stats(self):
+        """Get the cache counters.
+
+        :returns: A dictionary with the ``entries``, ``bytes``, ``hits``,
+            ``misses`` and ``evictions`` counters.
+        """
+        return dict(
+            entries=len(self._data),
+            bytes=self.size,
+            hits=self.hits,
+            misses=self.misses,
+            evictions=self.evictions,
+        )
+
+
+class _Call(object):
+    """A call in flight."""
+
+    def __init__(self):
+        """Initialize the call."""
+        self.done = Event()
+        self.value = None
+        self.error = None
+
+
+class SingleFlight(object):
+    """Coalesce the concurrent calls with the same key.
+
+    While a call is in flight, the threads calling with the same key wait
+    for it and share its result (or exception) instead of computing it
+    again.
+    """
+
+    def __init__(self):
+        """Initialize the call registry."""
+        self._calls = {}
+        self._lock = Lock()
+        self.calls = 0
+        self.shared = 0
+
+    def do(self, key, func):
+        """Call a function, unless a call with the same key is in flight.
+
+        :param key: The call key.
+        :param func: Function called without arguments.
+        :returns: The result of the call.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self.calls += 1
+            else:
+                self.shared += 1
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.value
+        try:
+            call.value = func()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.value
+
+    @property
+    def stats(self):
+        """Get the numbers of calls made and shared."""
+        return dict(calls=self.calls, shared=self.shared)
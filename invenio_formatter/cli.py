@@ -0,0 +1,258 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of Invenio.
+# Copyright (C) 2020 CERN.
+#
+# Invenio is free software; you can redistribute it and/or modify it
+# under the terms of the MIT License; see LICENSE file for more details.
+
+"""Command line interface for Invenio-Formatter."""
+
+from __future__ import absolute_import, print_function
+
+import gzip
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+
+
+@click.group()
+def formatter():
+    """Formatter commands."""
+
+
+@formatter.group()
+def badges():
+    """Badge commands."""
+
+
+def read_badges(lines):
+    """Read ``<title>/<value>`` lines, mapping the titles.
+
+    Empty lines and lines starting with ``#`` are skipped.
+
+    :param lines: Iterable of lines.
+    :returns: A list of ``(title, mapped title, value)`` tuples, and the list
+        of invalid lines (unknown title or missing value).
+    """
+    allowed = current_app.config['FORMATTER_BADGES_ALLOWED_TITLES']
+    mapping = current_app.config['FORMATTER_BADGES_TITLE_MAPPING']
+    items, invalid = [], []
+    for line in lines:
+        line = line.strip()
+        if not line or line.startswith('#'):
+            continue
+        title, _, value = line.partition('/')
+        if title not in allowed or not value:
+            invalid.append(line)
+            continue
+        items.append((title, mapping.get(title, title), value))
+    return items, invalid
+
+
+def run_parallel(func, items, jobs):
+    """Call a function on each item in threads with an application context.
+
+    :param func: Function called with each item.
+    :param items: The items.
+    :param jobs: Number of threads.
+    :returns: The list of ``(item, exception)`` of the failed calls.
+    """
+    app = current_app._get_current_object()
+
+    def call(item):
+        with app.app_context():
+            try:
+                func(item)
+            except Exception as e:
+                return item, e
+
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        return [failure for failure in executor.map(call, items) if failure]
+
+
+@badges.command('warm')
+@click.argument('source', type=click.File('r'), default='-')
+@click.option('--format', '-f', 'formats', type=click.Choice(['svg', 'png']),
+              multiple=True, help='Badge formats (default: svg and png).')
+@click.option('--jobs', '-j', type=int, default=4, show_default=True,
+              help='Number of badges rendered in parallel.')
+@with_appcontext
+def warm(source, formats, jobs):
+    """Render badges into the configured badge caches.
+
+    SOURCE is a file (default: standard input) with one ``<title>/<value>``
+    badge per line, e.g. ``DOI/10.1234/zenodo.1234``.
+    """
+    from .context_processors.badges import render_badge
+
+    items, invalid = read_badges(source)
+    for line in invalid:
+        click.secho('Invalid badge: {0}'.format(line), fg='red', err=True)
+
+    tasks = [(title, value, ext) for _, title, value in items
+             for ext in (formats or ('svg', 'png'))]
+    start = time.time()
+    failures = run_parallel(
+        lambda task: render_badge(task[0], task[1], ext=task[2]),
+        tasks, jobs)
+    elapsed = time.time() - start
+
+    for (title, value, ext), e in failures:
+        click.secho('Failed {0}/{1}.{2}: {3}'.format(title, value, ext, e),
+                    fg='red', err=True)
+    click.echo('Rendered {0} badges in {1:.2f}s ({2:.1f} badges/s), '
+               '{3} failed, {4} invalid.'.format(
+                   len(tasks) - len(failures), elapsed,
+                   len(tasks) / elapsed if elapsed else 0,
+                   len(failures), len(invalid)))
+    if failures or invalid:
+        raise click.exceptions.Exit(1)
+
+
+def _write_if_changed(path, data):
+    """Write a file unless it already has the same content.
+
+    :returns: ``True`` if the file was written.
+    """
+    try:
+        with open(path, 'rb') as fp:
+            if fp.read() == data:
+                return False
+    except IOError:
+        pass
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    tmp = '{0}.{1}.tmp'.format(path, os.getpid())
+    with open(tmp, 'wb') as fp:
+        fp.write(data)
+    os.replace(tmp, path)
+    return True
+
+
+def _export_badge(destination, item, formats, compress, font, backend):
+    """Export the files of a badge, in a worker process.
+
+    :returns: The numbers of written and unchanged files.
+    """
+    from .context_processors.badges import build_badge_svg, draw_badge_png
+    from .fonts import get_glyph_table
+
+    title, mapped_title, value = item
+    table = get_glyph_table(*font)
+    lengths = (table.measure(mapped_title), table.measure(value))
+    base = os.path.join(destination, 'badge', title, value)
+    files = []
+    if 'svg' in formats:
+        svg = build_badge_svg(
+            mapped_title, value, '#007ec6', lengths[0], lengths[1], font,
+        ).encode('utf-8')
+        files.append((base + '.svg', svg))
+        if 'gz' in compress:
+            files.append((base + '.svg.gz', gzip.compress(svg, mtime=0)))
+        if 'svgz' in compress:
+            files.append((base + '.svgz', gzip.compress(svg, mtime=0)))
+    if 'png' in formats:
+        files.append((base + '.png', draw_badge_png(
+            mapped_title, value, '#007ec6', font, backend, lengths)))
+
+    written = sum(_write_if_changed(path, data) for path, data in files)
+    return written, len(files) - written
+
+
+@badges.command('export')
+@click.argument('destination', type=click.Path(file_okay=False))
+@click.argument('source', type=click.File('r'), default='-')
+@click.option('--format', '-f', 'formats', type=click.Choice(['svg', 'png']),
+              multiple=True, help='Badge formats (default: svg and png).')
+@click.option('--compress', '-c', type=click.Choice(['gz', 'svgz']),
+              multiple=True,
+              help='Also write gzipped .svg.gz or .svgz files.')
+@click.option('--jobs', '-j', type=int, default=os.cpu_count(),
+              help='Number of processes (default: number of CPUs).')
+@with_appcontext
+def export(destination, source, formats, compress, jobs):
+    """Export badges as static files.
+
+    Files are written in DESTINATION with the URL layout of the badge view
+    (``badge/<title>/<value>.svg``), so that a web server can serve them.
+    Files whose content did not change are left untouched.
+
+    SOURCE is a file (default: standard input) with one ``<title>/<value>``
+    badge per line.
+    """
+    from .context_processors.badges import get_badges_font, get_png_backend
+
+    items, invalid = read_badges(source)
+    destination = os.path.abspath(destination)
+    for item in items:
+        path = os.path.abspath(os.path.join(destination, 'badge', *item[::2]))
+        if not path.startswith(destination + os.sep):
+            invalid.append('{0}/{1}'.format(*item[::2]))
+    items = [item for item in items
+             if '{0}/{1}'.format(*item[::2]) not in invalid]
+    for line in invalid:
+        click.secho('Invalid badge: {0}'.format(line), fg='red', err=True)
+
+    font, backend = get_badges_font(), get_png_backend()
+    formats = formats or ('svg', 'png')
+    written = unchanged = 0
+    failures = []
+    start = time.time()
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        futures = [
+            (item, executor.submit(_export_badge, destination, item,
+                                   formats, compress, font, backend))
+            for item in items
+        ]
+        for item, future in futures:
+            try:
+                counts = future.result()
+            except Exception as e:
+                failures.append((item, e))
+                continue
+            written += counts[0]
+            unchanged += counts[1]
+    elapsed = time.time() - start
+
+    for (title, _, value), e in failures:
+        click.secho('Failed {0}/{1}: {2}'.format(title, value, e),
+                    fg='red', err=True)
+    click.echo('Exported {0} badges in {1:.2f}s: {2} files written, '
+               '{3} unchanged, {4} failed, {5} invalid.'.format(
+                   len(items) - len(failures), elapsed, written, unchanged,
+                   len(failures), len(invalid)))
+    if failures or invalid:
+        raise click.exceptions.Exit(1)
+
+
+@formatter.group()
+def profile():
+    """Template profiler commands."""
+
+
+@profile.command('report')
+@click.argument('source', type=click.File('r'), default='-')
+@click.option('--top', '-n', type=int, default=20, show_default=True,
+              help='Number of hot spots to show.')
+def report(source, top):
+    """Aggregate the profiled requests logged in FORMATTER_PROFILER_LOG.
+
+    SOURCE is the log file (default: standard input).
+    """
+    from .profiler import aggregate_profiles
+
+    requests, duration, totals = aggregate_profiles(source)
+    click.echo('{0} requests, {1:.1f} ms per request.'.format(
+        requests, duration * 1000 / requests if requests else 0))
+    click.echo('{0:<40} {1:>8} {2:>8} {3:>10} {4:>11} {5:>7}'.format(
+        'name', 'requests', 'calls', 'total ms', 'ms/request', 'share'))
+    for name, name_requests, calls, seconds in totals[:top]:
+        click.echo('{0:<40} {1:>8} {2:>8} {3:>10.1f} {4:>11.2f} {5:>6.1%}'
+                   .format(name, name_requests, calls, seconds * 1000,
+                           seconds * 1000 / requests,
+                           seconds / duration if duration else 0))
@@ -18,3 +18,141 @@ FORMATTER_BADGES_TITLE_MAPPING = {}
 
 FORMATTER_BADGES_MAX_CACHE_AGE = 0
 """The maximum amount of time a badge will be considered fresh."""
+
+FORMATTER_BADGES_CACHE_POLICY = 'no-cache'
+"""HTTP caching policy of the badge responses.
+
+- ``'no-cache'``: clients revalidate badges on every use.
+- ``'public'``: badges are cached by clients for
+  ``FORMATTER_BADGES_MAX_CACHE_AGE`` seconds and by shared caches for
+  ``FORMATTER_BADGES_SHARED_MAX_AGE`` seconds.
+- ``'immutable'``: badges are cached for a year and never revalidated. A
+  badge only depends on its URL, but changing the badge font or upgrading
+  the renderer is then only visible on new badges.
+"""
+
+FORMATTER_BADGES_SHARED_MAX_AGE = None
+"""Time in seconds shared caches keep badges with the ``'public'`` policy.
+
+``None`` uses ``FORMATTER_BADGES_MAX_CACHE_AGE``.
+"""
+
+FORMATTER_BADGES_STALE_WHILE_REVALIDATE = None
+"""Time in seconds caches may serve stale badges while revalidating them.
+
+Only used with the ``'public'`` policy.
+"""
+
+FORMATTER_BADGES_FONT = ('DejaVuSans', 11)
+"""Font name (or path) and size used to measure the badge texts."""
+
+FORMATTER_BADGES_SPRITE_MAX_BADGES = 100
+"""Maximum number of badges in a sprite."""
+
+FORMATTER_BADGES_PNG_BACKEND = 'pillow'
+"""Backend drawing the PNG badges.
+
+- ``'pillow'`` draws the badge directly with Pillow.
+- ``'cairosvg'`` converts the SVG badge with CairoSVG (must be installed).
+"""
+
+FORMATTER_BADGES_ENCODINGS = ['br', 'gzip']
+"""Content encodings of the SVG badges, by order of preference.
+
+Compressed badges are cached next to the uncompressed ones and sent to the
+clients accepting them. ``'br'`` requires the ``brotli`` package and is
+skipped when it is not installed. An empty list disables compression.
+"""
+
+FORMATTER_BADGES_NEGOTIATE_WEBP = True
+"""Send PNG badges as lossless WebP to the clients accepting it.
+
+WebP badges are smaller. Badges explicitly requested as ``.webp`` are always
+sent as WebP.
+"""
+
+FORMATTER_BADGES_MAX_TITLE_LENGTH = 64
+"""Maximum length of the (mapped) badge titles served by the badge views."""
+
+FORMATTER_BADGES_MAX_VALUE_LENGTH = 512
+"""Maximum length of the badge values served by the badge views."""
+
+FORMATTER_BADGES_MAX_RENDERS = 0
+"""Maximum number of badges rendered at once by each process for the badge
+views (``0`` for no limit). Cached badges are not limited."""
+
+FORMATTER_BADGES_MAX_QUEUED_RENDERS = 8
+"""Maximum number of renders waiting when ``FORMATTER_BADGES_MAX_RENDERS``
+is reached. Further requests get a ``503 Service Unavailable``."""
+
+FORMATTER_BADGES_QUEUE_TIMEOUT = 0.5
+"""Seconds a render waits in the queue before getting a ``503``."""
+
+FORMATTER_BADGES_RETRY_AFTER = 1
+"""``Retry-After`` seconds of the ``503`` responses of the badge views."""
+
+FORMATTER_BADGES_RENDER_WORKERS = 0
+"""Number of processes drawing PNG badges (``0`` draws them inline)."""
+
+FORMATTER_BADGES_RENDER_TIMEOUT = 2.0
+"""Seconds to wait for a PNG badge from the render processes before drawing
+it inline."""
+
+FORMATTER_BADGES_RENDER_MAX_PENDING = 16
+"""Maximum number of PNG badges waiting for the render processes; further
+badges are drawn inline."""
+
+FORMATTER_BADGES_CACHE_MAX_ENTRIES = 1024
+"""Maximum number of rendered badges kept in memory (``0`` disables it)."""
+
+FORMATTER_BADGES_CACHE_MAX_BYTES = 4 * 1024 * 1024
+"""Maximum size in bytes of the rendered badges kept in memory."""
+
+FORMATTER_BADGES_STORE_ENABLE = False
+"""Share rendered badges between the worker processes through a file."""
+
+FORMATTER_BADGES_STORE_FILENAME = 'badges.store'
+"""Name of the badge store file, relative to the instance path."""
+
+FORMATTER_BADGES_STORE_CAPACITY = 64 * 1024 * 1024
+"""Size in bytes of the badge store file."""
+
+FORMATTER_BADGES_STORE_RENDER_LOCKS = False
+"""Render each badge in one process at a time, through a lock file next to
+the badge store, so that the other processes get it from the store."""
+
+FORMATTER_DATES_CACHE_MAX_ENTRIES = 0
+"""Number of date strings memoized by the ``from_isodate``,
+``from_isodatetime`` and ``to_arrow`` filters (``0`` disables it).
+
+The hit rate is given by the ``date_cache.stats`` of the extension.
+"""
+
+FORMATTER_METRICS_ENABLE = False
+"""Measure the filters, the badge renders and the badge views.
+
+See :mod:`invenio_formatter.metrics`.
+"""
+
+FORMATTER_METRICS_ROUTE = False
+"""Expose the metrics in the Prometheus text format at ``/badges/metrics``.
+
+Requires ``FORMATTER_METRICS_ENABLE``. Restrict the access to this route in
+the web server.
+"""
+
+FORMATTER_PROFILER_ENABLE = False
+"""Profile the template macros and the formatter filters.
+
+See :mod:`invenio_formatter.profiler`.
+"""
+
+FORMATTER_PROFILER_SAMPLE_RATE = 1.0
+"""Ratio of the requests which are profiled."""
+
+FORMATTER_PROFILER_HEADER = True
+"""Send the timings of the profiled requests in a ``Server-Timing`` header."""
+
+FORMATTER_PROFILER_LOG = None
+"""File where the timings of the profiled requests are appended, to be
+aggregated by ``formatter profile report``."""
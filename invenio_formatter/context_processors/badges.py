@@ -10,25 +10,191 @@
 
 from __future__ import absolute_import, print_function
 
+import gzip
+import hashlib
+import re
+import time
 from base64 import b64encode
+from datetime import datetime, timezone
+from functools import partial
+from io import BytesIO
+from string import Formatter
+from urllib.parse import quote
+from xml.sax.saxutils import escape
+from zlib import crc32
 
-import cairosvg
-from PIL import Image, ImageDraw, ImageFont
+from flask import current_app, has_app_context, has_request_context, \
+    request
+from PIL import Image
+
+from ..cache import sizeof
+from ..config import FORMATTER_BADGES_FONT, FORMATTER_BADGES_PNG_BACKEND
+from ..fonts import get_glyph_table, load_font
+from ..proxies import current_formatter
+from ..raster import encode_image, rasterize_badge
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+def get_badges_font():
+    """Get the font name and size used by badges.
+
+    :returns: A ``(name, size)`` tuple, taken from
+        ``FORMATTER_BADGES_FONT`` when an application is available.
+    """
+    if has_app_context():
+        return tuple(current_app.config.get(
+            'FORMATTER_BADGES_FONT', FORMATTER_BADGES_FONT))
+    return FORMATTER_BADGES_FONT
 
 
 def get_text_length(*args):
     r"""Measure the size of string rendered with a TTF no-nomospaced fonts.
 
+    The measurement uses the glyph table of the font configured in
+    ``FORMATTER_BADGES_FONT``, which is built once per process.
+
     :param \*args: List of strings to be measured.
     :returns: The length of the strings.
     """
-    txt = Image.new('RGBA', (16, 16), (255, 255, 255, 0))
-    d = ImageDraw.Draw(txt)
-    font = ImageFont.truetype("DejaVuSans", 11)
-    result = ()
-    for value in args:
-        result = result + (d.textsize(value, font=font)[0], )
-    return result
+    table = get_glyph_table(*get_badges_font())
+    return tuple(table.measure(value) for value in args)
+
+
+BADGE_RENDERER_VERSION = '3'
+"""Version of the badge renderer, to bump when the rendered output changes."""
+
+BADGE_RENDERER_DATE = datetime(2020, 6, 1, tzinfo=timezone.utc)
+"""Release date of the badge renderer version, used as Last-Modified."""
+
+
+def badge_etag(*parts):
+    r"""Compute the ETag of a badge without rendering it.
+
+    The ETag depends on the renderer version and the badge font, so that
+    clients revalidate badges after they change.
+
+    :param \*parts: The strings identifying the badge, e.g. the mapped
+        title, the value and the format.
+    :returns: The ETag.
+    """
+    name, size = get_badges_font()
+    hashable = u'\0'.join(
+        (BADGE_RENDERER_VERSION, name, str(size)) + parts).encode('utf-8')
+    return hashlib.blake2b(hashable, digest_size=16).hexdigest()
+
+
+BADGE_SVG_TEMPLATE = '''
+<svg xmlns="http://www.w3.org/2000/svg"
+     xmlns:xlink="http://www.w3.org/1999/xlink"
+     width="{width}" height="20">
+    <linearGradient id="b{key}" x2="0" y2="100%">
+        <stop offset="0" stop-color="#bbb" stop-opacity=".1"/>
+        <stop offset="1" stop-opacity=".1"/>
+    </linearGradient>
+    <mask id="a{key}">
+        <rect width="{width}" height="20" rx="3" fill="#fff"/>
+    </mask>
+    <g mask="url(#a{key})">
+        <path fill="#555" d="M0 0h{title_width}v20H0z"/>
+        <path fill="{color}"
+              d="M{title_width} 0h{value_width}v20H{title_width}z"/>
+        <path fill="url(#b{key})" d="M0 0h{width}v20H0z"/>
+    </g>
+    <g text-anchor="middle"
+       font-family="{font_family},Verdana,Geneva,sans-serif"
+       font-size="{font_size}">
+        <defs>
+            <g id="t{key}">
+                <text x="{title_position}" y="14">{title}</text>
+                <text x="{value_position}" y="14">{value}</text>
+            </g>
+        </defs>
+        <use xlink:href="#t{key}" y="1" fill="#010101" fill-opacity=".3"/>
+        <use xlink:href="#t{key}" fill="#fff"/>
+    </g>
+</svg>
+'''
+"""SVG badge template.
+
+The font family and size are the ones of ``FORMATTER_BADGES_FONT``, used to
+measure the texts. The shadow and the text are two ``<use>`` of the same text
+group. Element identifiers are suffixed with ``key`` so that several badges
+can be inlined in the same HTML page.
+"""
+
+
+def compile_svg_template(template):
+    """Minify a SVG template and split it into fixed segments.
+
+    :param template: A SVG template with ``str.format`` replacement fields.
+    :returns: A tuple of ``(literal, field)`` pairs, where ``field`` is
+        ``None`` for the trailing literal.
+    """
+    template = re.sub(r'>\s+<', '><', template.strip())
+    template = re.sub(r'\s+', ' ', template)
+    return tuple(
+        (literal, field)
+        for literal, field, _, _ in Formatter().parse(template)
+    )
+
+
+def render_svg_template(segments, **values):
+    r"""Render a template compiled by :func:`compile_svg_template`.
+
+    :param segments: The compiled template.
+    :param \**values: Values of the replacement fields.
+    :returns: The rendered SVG.
+    """
+    parts = []
+    for literal, field in segments:
+        parts.append(literal)
+        if field is not None:
+            parts.append(values[field])
+    return ''.join(parts)
+
+
+_badge_svg_segments = compile_svg_template(BADGE_SVG_TEMPLATE)
+
+
+def _format_number(number):
+    """Format a coordinate without a trailing ``.0``."""
+    if number == int(number):
+        return str(int(number))
+    return str(number)
+
+
+def build_badge_svg(title, value, color, title_length, value_length, font):
+    """Build the SVG of a badge whose texts are already measured.
+
+    :param title: The badge title.
+    :param value: The badge content.
+    :param color: The badge color.
+    :param title_length: The width of the title.
+    :param value_length: The width of the value.
+    :param font: The ``(name, size)`` of the font.
+    :returns: The SVG badge.
+    """
+    name, size = font
+    return render_svg_template(
+        _badge_svg_segments,
+        key='{0:x}'.format(
+            crc32(u'{0}\0{1}'.format(title, value).encode('utf-8'))),
+        title_width=str(title_length + 11),
+        value_width=str(value_length + 11),
+        width=str(title_length + value_length + 22),
+        title_position=_format_number(title_length / 2 + 6),
+        value_position=_format_number(title_length + value_length / 2 + 16),
+        font_family=escape(load_font(name, size).getname()[0],
+                           {'"': '&quot;'}),
+        font_size=str(size),
+        title=escape(title),
+        value=escape(value),
+        color=color,
+    )
 
 
 def generate_badge_svg(title, value, color='#007ec6'):
@@ -40,71 +206,419 @@ def generate_badge_svg(title, value, color='#007ec6'):
     :returns: The SVG badge.
     """
     (title_length, value_length) = get_text_length(title, value)
-    return '''<svg xmlns="http://www.w3.org/2000/svg"
-     width="{width}" height="20">
-        <linearGradient id="b" x2="0" y2="100%">
-            <stop offset="0" stop-color="#bbb" stop-opacity=".1"/>
-            <stop offset="1" stop-opacity=".1"/>
-        </linearGradient>
-        <mask id="a" width="{width}" height="20">
-            <rect width="{width}" height="20" rx="3"
-            fill="#fff"/>
-        </mask>
-        <g mask="url(#a)">
-            <path fill="#555" d="M0 0h{title_width}v20H0z" />
-            <path fill="{color}"
-            d="M{title_width} 0h{value_width}v20H{title_width}z"
-            />
-            <path fill="url(#b)" d="M0 0h{width}v20H0z" />
-        </g>
-        <g fill="#fff" text-anchor="middle" font-family="DejaVu Sans,
-        Verdana,Geneva,sans-serif" font-size="11">
-            <text x="{title_position}" y="15" fill="#010101"
-            fill-opacity=".3">
-                {title}
-            </text>
-            <text x="{title_position}" y="14">
-                {title}
-            </text>
-            <text x="{value_position}"
-            y="15" fill="#010101" fill-opacity=".3">
-                {value}
-            </text>
-            <text x="{value_position}" y="14">
-                {value}
-            </text>
-        </g>
-    </svg>'''.format(
-        title_width=title_length + 11,
-        value_width=value_length + 11,
-        width=title_length + value_length + 22,
-        title_position=title_length / 2 + 6,
-        value_position=title_length + value_length / 2 + 16,
-        title=title,
-        value=value,
-        color=color,
-    )
+    return build_badge_svg(title, value, color, title_length, value_length,
+                           get_badges_font())
+
+
+def get_png_backend():
+    """Get the backend drawing PNG badges.
+
+    :returns: ``FORMATTER_BADGES_PNG_BACKEND`` when an application is
+        available, else its default value.
+    """
+    if has_app_context():
+        return current_app.config.get(
+            'FORMATTER_BADGES_PNG_BACKEND', FORMATTER_BADGES_PNG_BACKEND)
+    return FORMATTER_BADGES_PNG_BACKEND
+
+
+def parse_badge_format(ext):
+    """Split a badge format into its image format and scale.
+
+    :param ext: The badge format, e.g. ``'svg'``, ``'png'`` or
+        ``'webp@2x'``.
+    :returns: A ``(format, scale)`` tuple, e.g. ``('webp', 2)``.
+    """
+    fmt, _, scale = ext.partition('@')
+    return fmt, int(scale[:-1]) if scale else 1
+
+
+def draw_badge_image(title, value, color, font, backend, lengths=None,
+                     ext='png'):
+    """Draw a raster badge with an explicit font and backend.
+
+    It does not need an application, so that it can run in other processes.
+
+    :param title: The badge title.
+    :param value: The badge content.
+    :param color: The badge color.
+    :param font: The ``(name, size)`` of the font.
+    :param backend: ``'pillow'`` or ``'cairosvg'``.
+    :param lengths: The widths of the title and value, measured if
+        ``None``. (Default: ``None``)
+    :param ext: The badge format, ``'png'`` or ``'webp'``, optionally
+        scaled (e.g. ``'png@2x'``). (Default: ``'png'``)
+    :returns: The image bytes.
+    """
+    fmt, scale = parse_badge_format(ext)
+    if lengths is None:
+        table = get_glyph_table(*font)
+        lengths = (table.measure(title), table.measure(value))
+    if backend == 'cairosvg':
+        import cairosvg
+        png = cairosvg.svg2png(
+            build_badge_svg(title, value, color, lengths[0], lengths[1], font),
+            scale=scale)
+        if fmt == 'png':
+            return png
+        return encode_image(Image.open(BytesIO(png)), fmt)
+    name, size = font
+    return rasterize_badge(title, value, color, load_font(name, size * scale),
+                           lengths[0], lengths[1], scale, fmt)
+
+
+def draw_badge_png(title, value, color, font, backend, lengths=None):
+    """Draw a PNG badge with an explicit font and backend.
+
+    See :func:`draw_badge_image`.
+
+    :returns: The PNG badge.
+    """
+    return draw_badge_image(title, value, color, font, backend, lengths)
+
+
+def generate_badge_image(title, value, color='#007ec6', ext='png'):
+    """Generate the badge in a raster format.
+
+    The badge is drawn with Pillow, or converted from the SVG badge by
+    CairoSVG, depending on ``FORMATTER_BADGES_PNG_BACKEND``.
+
+    :param title: The badge title.
+    :param value: The badge content.
+    :param color: The badge color. (Default: ``'#007ec6'``)
+    :param ext: The badge format, e.g. ``'png'`` or ``'webp@2x'``.
+        (Default: ``'png'``)
+    :returns: The image bytes.
+    """
+    return draw_badge_image(
+        title, value, color, get_badges_font(), get_png_backend(), ext=ext)
 
 
 def generate_badge_png(title, value, color='#007ec6'):
-    """Generate the badge in PNG format."""
-    badge = generate_badge_svg(title, value, color)
-    return cairosvg.svg2png(badge)
+    """Generate the badge in PNG format.
+
+    The badge is drawn with Pillow, or converted from the SVG badge by
+    CairoSVG, depending on ``FORMATTER_BADGES_PNG_BACKEND``.
+
+    :param title: The badge title.
+    :param value: The badge content.
+    :param color: The badge color. (Default: ``'#007ec6'``)
+    :returns: The PNG badge.
+    """
+    return generate_badge_image(title, value, color)
+
+
+BADGE_SCALES = (1, 2, 3)
+"""Scale factors of the raster badges."""
+
+BADGE_GENERATORS = {
+    'svg': generate_badge_svg,
+    'png': generate_badge_png,
+}
+"""Badge generator of each format.
+
+Raster formats are also available scaled, e.g. ``'png@2x'`` or
+``'webp@3x'``.
+"""
+
+BADGE_GENERATORS.update(
+    (ext, partial(generate_badge_image, ext=ext))
+    for ext in ('{0}@{1}x'.format(fmt, scale) if scale > 1 else fmt
+                for fmt in ('png', 'webp') for scale in BADGE_SCALES)
+    if ext not in BADGE_GENERATORS
+)
+
+
+def render_badge(title, value, color='#007ec6', ext='svg'):
+    """Render a badge through the badge caches of the current application.
+
+    The in-process cache is looked up first, then the badge store shared by
+    the workers (if enabled), and the badge is generated on a miss. Outside
+    of an application context, or when the extension is not installed, the
+    badge is always generated.
+
+    :param title: The badge title (already mapped).
+    :param value: The badge content.
+    :param color: The badge color. (Default: ``'#007ec6'``)
+    :param ext: The badge format, one of :data:`BADGE_GENERATORS`.
+        (Default: ``'svg'``)
+    :returns: The rendered badge.
+    """
+    if not has_app_context() or \
+            'invenio-formatter' not in current_app.extensions:
+        return BADGE_GENERATORS[ext](title, value, color)
+    key = (title, value, color, ext)
+    return current_formatter.badge_cache.get_or_set(
+        key,
+        lambda: current_formatter.badge_flights.do(
+            key, lambda: _render_stored_badge(title, value, color, ext)),
+    )
+
+
+def get_badge_encodings():
+    """Get the content encodings of the SVG badges.
+
+    :returns: The ``FORMATTER_BADGES_ENCODINGS`` supported by the installed
+        packages.
+    """
+    encodings = current_app.config.get('FORMATTER_BADGES_ENCODINGS', [])
+    return [encoding for encoding in encodings
+            if encoding == 'gzip' or (encoding == 'br' and brotli)]
+
+
+def compress_badge(data, encoding):
+    """Compress a badge.
+
+    :param data: The badge, as text or bytes.
+    :param encoding: ``'gzip'`` or ``'br'``.
+    :returns: The compressed bytes.
+    """
+    if not isinstance(data, bytes):
+        data = data.encode('utf-8')
+    if encoding == 'gzip':
+        return gzip.compress(data, mtime=0)
+    return brotli.compress(data, mode=brotli.MODE_TEXT)
+
+
+def render_badge_encoded(title, value, color='#007ec6', ext='svg',
+                         encoding=None):
+    """Render a badge with a content encoding.
+
+    Compressed badges are cached like the other badges, so each badge is
+    compressed once.
+
+    :param title: The badge title (already mapped).
+    :param value: The badge content.
+    :param color: The badge color. (Default: ``'#007ec6'``)
+    :param ext: The badge format, ``'svg'`` or ``'png'``.
+        (Default: ``'svg'``)
+    :param encoding: ``'gzip'``, ``'br'`` or ``None`` for the uncompressed
+        badge. (Default: ``None``)
+    :returns: The badge bytes.
+    """
+    if encoding is None:
+        badge = render_badge(title, value, color, ext)
+        return badge.encode('utf-8') if ext == 'svg' else badge
+    if not has_app_context() or \
+            'invenio-formatter' not in current_app.extensions:
+        return compress_badge(render_badge(title, value, color, ext),
+                              encoding)
+    return current_formatter.badge_cache.get_or_set(
+        (title, value, color, ext, encoding),
+        lambda: compress_badge(render_badge(title, value, color, ext),
+                               encoding),
+    )
+
+
+def _generate_badge(title, value, color, ext):
+    """Generate a badge, drawing PNG badges in the render pool if enabled.
+
+    Badges requested from the badge views wait for a render slot of the
+    admission control.
+    """
+    if has_request_context() and \
+            request.blueprint == 'invenio_formatter_badges':
+        with current_formatter.badge_admission.slot():
+            return _draw_badge(title, value, color, ext)
+    return _draw_badge(title, value, color, ext)
+
+
+def _draw_badge(title, value, color, ext):
+    """Generate a badge, measuring it if metrics are enabled."""
+    metrics = current_formatter.metrics
+    if metrics is None:
+        return _draw_badge_pooled(title, value, color, ext)
+    start = time.perf_counter()
+    badge = _draw_badge_pooled(title, value, color, ext)
+    metrics.observe('badge.render.{0}'.format(ext),
+                    time.perf_counter() - start, sizeof(badge))
+    return badge
+
+
+def _draw_badge_pooled(title, value, color, ext):
+    """Generate a badge, in the render pool if enabled."""
+    pool = current_formatter.render_pool
+    if ext != 'svg' and pool is not None:
+        badge = pool.render_png(title, value, color, ext)
+        if badge is not None:
+            return badge
+    return BADGE_GENERATORS[ext](title, value, color)
+
+
+def _render_stored_badge(title, value, color, ext):
+    """Get a badge from the badge store, generating it on a miss."""
+    store = current_formatter.badge_store
+    if store is None:
+        return _generate_badge(title, value, color, ext)
+
+    key = (title, value, color, ext)
+    data = store.get(key)
+    if data is None:
+        with store.render_lock(key):
+            if store.render_locks:
+                # Another process may have stored it while we waited.
+                data = store.get(key)
+            if data is None:
+                badge = _generate_badge(title, value, color, ext)
+                store.set(
+                    key, badge.encode('utf-8') if ext == 'svg' else badge)
+                return badge
+    return data.decode('utf-8') if ext == 'svg' else data
+
+
+def generate_badges(items, fmt='svg'):
+    """Generate many badges at once.
+
+    Duplicated badges are generated once and each distinct text is measured
+    once, which is much faster than generating the badges one by one when
+    titles such as ``'DOI'`` repeat.
+
+    :param items: Iterable of ``(title, value)`` or ``(title, value, color)``
+        tuples.
+    :param fmt: The badge format, ``'svg'`` or ``'png'``. (Default: ``'svg'``)
+    :returns: The list of badges, in the order of ``items``.
+    """
+    items = [
+        tuple(item) if len(item) == 3 else (item[0], item[1], '#007ec6')
+        for item in items
+    ]
+    font = get_badges_font()
+    table = get_glyph_table(*font)
+    lengths = {}
+    for title, value, _ in items:
+        for text in (title, value):
+            if text not in lengths:
+                lengths[text] = table.measure(text)
+
+    if fmt == 'svg':
+        def generate(title, value, color):
+            return build_badge_svg(title, value, color, lengths[title],
+                                   lengths[value], font)
+    elif fmt == 'png':
+        backend = get_png_backend()
+
+        def generate(title, value, color):
+            return draw_badge_png(title, value, color, font, backend,
+                                  (lengths[title], lengths[value]))
+    else:
+        raise ValueError('Unknown badge format: {0}'.format(fmt))
+
+    badges = {}
+    for item in items:
+        if item not in badges:
+            badges[item] = generate(*item)
+    return [badges[item] for item in items]
+
+
+def generate_badge_sprite(items, fmt='svg'):
+    """Generate a sprite stacking many badges vertically.
+
+    In the SVG sprite, the badge at position ``i`` is addressable with the
+    ``#badge-i`` fragment identifier (e.g. ``sprite.svg#badge-0``).
+
+    :param items: Iterable of ``(title, value)`` or ``(title, value, color)``
+        tuples.
+    :param fmt: The sprite format, ``'svg'`` or ``'png'``.
+        (Default: ``'svg'``)
+    :returns: The sprite.
+    """
+    items = list(items)
+    badges = generate_badges(items, fmt)
+    if fmt == 'png':
+        images = [Image.open(BytesIO(badge)) for badge in badges]
+        sprite = Image.new(
+            'RGBA', (max([image.width for image in images] or [1]),
+                     sum(image.height for image in images) or 1))
+        y = 0
+        for image in images:
+            sprite.paste(image, (0, y))
+            y += image.height
+        output = BytesIO()
+        sprite.save(output, 'PNG')
+        return output.getvalue()
+
+    table = get_glyph_table(*get_badges_font())
+    widths = [table.measure(item[0]) + table.measure(item[1]) + 22
+              for item in items]
+    parts = [
+        '<svg xmlns="http://www.w3.org/2000/svg" width="{0}" '
+        'height="{1}">'.format(max(widths or [0]), 20 * len(items))
+    ]
+    for i, (badge, width) in enumerate(zip(badges, widths)):
+        # Nest each badge, moved down, by rewriting its opening "<svg".
+        parts.append(
+            '<view id="badge-{0}" viewBox="0 {1} {2} 20"/>'
+            '<svg y="{1}"{3}'.format(i, 20 * i, width, badge[4:]))
+    parts.append('</svg>')
+    return ''.join(parts)
+
+
+def _cached_datauri(title, value, color, ext, build):
+    """Get a badge data URI from the badge cache, building it on a miss."""
+    if not has_app_context() or \
+            'invenio-formatter' not in current_app.extensions:
+        return build()
+    return current_formatter.badge_cache.get_or_set(
+        (title, value, color, ext, 'datauri'), build)
+
+
+def badge_svg_datauri(title, value, color='#007ec6'):
+    """Get the data URI of an SVG badge.
+
+    The SVG is percent-encoded, which is much smaller than base64.
+
+    :param title: The badge title (already mapped).
+    :param value: The badge content.
+    :param color: The badge color. (Default: ``'#007ec6'``)
+    :returns: The ``data:image/svg+xml`` URI.
+    """
+    return _cached_datauri(title, value, color, 'svg', lambda: (
+        'data:image/svg+xml,' + quote(
+            render_badge(title, value, color, 'svg'),
+            safe=" !$&'()*+,-./:;=?@_~")))
+
+
+def badge_png_datauri(title, value, color='#007ec6'):
+    """Get the data URI of a PNG badge.
+
+    :param title: The badge title (already mapped).
+    :param value: The badge content.
+    :param color: The badge color. (Default: ``'#007ec6'``)
+    :returns: The ``data:image/png;base64`` URI.
+    """
+    return _cached_datauri(title, value, color, 'png', lambda: (
+        'data:image/png;base64,' + b64encode(
+            render_badge(title, value, color, 'png')).decode('ascii')))
+
+
+def badge_svg(title, value, color='#007ec6'):
+    """Context processor function to generate SVG badges."""
+    return render_badge(title, value, color, 'svg')
+
+
+def badges_svg(items):
+    """Context processor function to generate many SVG badges."""
+    return generate_badges(items, 'svg')
+
+
+def badges_png(items):
+    """Context processor function to generate many PNG badges."""
+    return [
+        'data:image/png;base64,{0}'.format(b64encode(png).decode('ascii'))
+        for png in generate_badges(items, 'png')
+    ]
+
+
+BADGE_TEMPLATE_HELPERS = dict(
+    badge_svg=badge_svg,
+    badge_png=badge_png_datauri,
+    badge_svg_datauri=badge_svg_datauri,
+    badges_svg=badges_svg,
+    badges_png=badges_png,
+)
+"""Functions added to the template contexts by :func:`badges_processor`."""
 
 
 def badges_processor():
     """Context processor for badges."""
-    def badge_svg(title, value, color='#007ec6'):
-        """Context processor function to generate SVG badges."""
-        return generate_badge_svg(title, value, color)
-
-    def badge_png(title, value, color='#007ec6'):
-        """Context processor function to generate SVG badges."""
-        png = generate_badge_png(title, value, color)
-        png_base64 = b64encode(png)
-        return 'data:image/png;base64,{0}'.format(png_base64)
-
-    return dict(
-        badge_svg=badge_svg,
-        badge_png=badge_png
-    )
+    return BADGE_TEMPLATE_HELPERS
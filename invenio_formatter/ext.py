@@ -10,11 +10,15 @@
 
 from __future__ import absolute_import, print_function
 
+import os
+
 from pkg_resources import DistributionNotFound, get_distribution
 
 from . import config
+from .admission import RenderAdmission
+from .cache import LRUCache, SingleFlight, sizeof
 from .filters.datetime import format_arrow, from_isodate, from_isodatetime, \
-    to_arrow
+    memoize_date_filter, to_arrow
 from .filters.html import sanitize_html
 from .views import create_badge_blueprint
 
@@ -37,14 +41,72 @@ class InvenioFormatter(object):
         """
         self.init_config(app)
 
+        self.badge_cache = LRUCache(
+            max_entries=app.config['FORMATTER_BADGES_CACHE_MAX_ENTRIES'],
+            max_bytes=app.config['FORMATTER_BADGES_CACHE_MAX_BYTES'],
+        )
+        self.badge_flights = SingleFlight()
+        self.badge_store = None
+        if app.config['FORMATTER_BADGES_STORE_ENABLE']:
+            from .context_processors.badges import BADGE_RENDERER_VERSION
+            from .store import BadgeStore
+            self.badge_store = BadgeStore(
+                os.path.join(app.instance_path,
+                             app.config['FORMATTER_BADGES_STORE_FILENAME']),
+                capacity=app.config['FORMATTER_BADGES_STORE_CAPACITY'],
+                namespace='{0}:{1}:{2}'.format(
+                    BADGE_RENDERER_VERSION,
+                    *app.config['FORMATTER_BADGES_FONT']),
+                render_locks=app.config['FORMATTER_BADGES_STORE_RENDER_LOCKS'],
+            )
+        self.badge_admission = RenderAdmission(
+            app.config['FORMATTER_BADGES_MAX_RENDERS'],
+            max_queued=app.config['FORMATTER_BADGES_MAX_QUEUED_RENDERS'],
+            timeout=app.config['FORMATTER_BADGES_QUEUE_TIMEOUT'],
+        )
+        self.render_pool = None
+        if app.config['FORMATTER_BADGES_RENDER_WORKERS']:
+            from .pool import RenderPool
+            self.render_pool = RenderPool(
+                app.config['FORMATTER_BADGES_RENDER_WORKERS'],
+                font=app.config['FORMATTER_BADGES_FONT'],
+                backend=app.config['FORMATTER_BADGES_PNG_BACKEND'],
+                timeout=app.config['FORMATTER_BADGES_RENDER_TIMEOUT'],
+                max_pending=app.config['FORMATTER_BADGES_RENDER_MAX_PENDING'],
+            )
+
+        self.metrics = None
+        if app.config['FORMATTER_METRICS_ENABLE']:
+            from .metrics import FormatterMetrics
+            self.metrics = FormatterMetrics(caches=self.cache_stats)
+
         # Install datetime helpers.
-        app.jinja_env.filters.update(
+        filters = dict(
             from_isodate=from_isodate,
             from_isodatetime=from_isodatetime,
             to_arrow=to_arrow,
             format_arrow=format_arrow,
             sanitize_html=sanitize_html,
         )
+        self.date_cache = None
+        if app.config['FORMATTER_DATES_CACHE_MAX_ENTRIES']:
+            self.date_cache = LRUCache(
+                max_entries=app.config['FORMATTER_DATES_CACHE_MAX_ENTRIES'],
+                sizeof=lambda value: 0,
+            )
+            for name in ('from_isodate', 'from_isodatetime', 'to_arrow'):
+                filters[name] = memoize_date_filter(
+                    filters[name], self.date_cache)
+        if self.metrics is not None:
+            filters = dict(
+                (name, self.metrics.instrument(
+                    'filter.{0}'.format(name), func,
+                    sizeof if name == 'sanitize_html' else None))
+                for name, func in filters.items())
+        app.jinja_env.filters.update(filters)
+        if app.config['FORMATTER_PROFILER_ENABLE']:
+            from .profiler import init_profiler
+            init_profiler(app, filters)
 
         if app.config['FORMATTER_BADGES_ENABLE']:
             from invenio_formatter.context_processors.badges import \
@@ -54,26 +116,43 @@ class InvenioFormatter(object):
             app.context_processor(badges_processor)
             # Register blueprint.
             app.register_blueprint(create_badge_blueprint(
-                app.config['FORMATTER_BADGES_ALLOWED_TITLES']))
+                app.config['FORMATTER_BADGES_ALLOWED_TITLES'],
+                metrics=self.metrics,
+                metrics_route=app.config['FORMATTER_METRICS_ROUTE'],
+            ))
 
         app.extensions['invenio-formatter'] = self
 
+    def cache_stats(self):
+        """Get the counters of the badge caches.
+
+        :returns: The ``stats`` of the in-process cache (``'memory'``), of
+            the badge store (``'store'``) and of the date filters cache
+            (``'dates'``) if enabled, by name.
+        """
+        caches = dict(memory=self.badge_cache.stats)
+        if self.badge_store is not None:
+            caches['store'] = self.badge_store.stats
+        if self.date_cache is not None:
+            caches['dates'] = self.date_cache.stats
+        return caches
+
     @staticmethod
     def init_config(app):
         """Initialize configuration.
 
-        .. note:: If CairoSVG is installed then the configuration
+        .. note:: If Pillow is installed then the configuration
             ``FORMATTER_BADGES_ENABLE`` is ``True``.
 
         :param app: The Flask application.
         """
         try:
-            get_distribution('CairoSVG')
-            has_cairo = True
+            get_distribution('Pillow')
+            has_pillow = True
         except DistributionNotFound:
-            has_cairo = False
+            has_pillow = False
 
-        app.config.setdefault('FORMATTER_BADGES_ENABLE', has_cairo)
+        app.config.setdefault('FORMATTER_BADGES_ENABLE', has_pillow)
 
         for attr in dir(config):
             if attr.startswith('FORMATTER_'):
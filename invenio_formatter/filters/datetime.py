@@ -10,7 +10,53 @@
 
 from __future__ import absolute_import, print_function
 
+import re
+from datetime import datetime
+from functools import lru_cache, wraps
+
 import arrow
+from arrow.formatter import DateTimeFormatter
+from arrow.parser import TzinfoParser
+
+ISO_DATETIME = re.compile(
+    r'(\d{4})-(\d{2})-(\d{2})'
+    r'(?:[T ](\d{2}):(\d{2})(?::(\d{2})(?:\.(\d{1,6}))?)?'
+    r'(Z|[+-]\d{2}:?\d{2})?)?$'
+)
+"""Canonical ISO 8601 forms parsed without arrow, e.g. ``2020-06-01``,
+``2020-06-01T12:34:56.789Z`` or ``2020-06-01 12:34+02:00``."""
+
+
+@lru_cache(maxsize=64)
+def _parse_tzinfo(value):
+    """Parse a time zone offset as arrow does."""
+    return TzinfoParser.parse(value)
+
+
+def parse_isodatetime(value):
+    """Parse a canonical ISO 8601 date or datetime as :func:`arrow.get`.
+
+    :param value: The string to parse.
+    :returns: The timezone-aware datetime (in UTC when the value has no
+        offset), or ``None`` if the value is not in one of the canonical
+        forms of :data:`ISO_DATETIME` or is not a valid date, so that it is
+        parsed by arrow instead.
+    """
+    match = ISO_DATETIME.match(value)
+    if match is None:
+        return None
+    year, month, day, hour, minute, second, fraction, offset = \
+        match.groups()
+    try:
+        return datetime(
+            int(year), int(month), int(day),
+            int(hour or 0), int(minute or 0), int(second or 0),
+            int(fraction.ljust(6, '0')) if fraction else 0,
+            tzinfo=_parse_tzinfo(
+                'UTC' if offset is None or offset == 'Z' else offset),
+        )
+    except ValueError:
+        return None
 
 
 def from_isodate(value, strict=False):
@@ -23,6 +69,10 @@ def from_isodate(value, strict=False):
     :returns: The Date object or ``None``.
     """
     if value or strict:
+        if isinstance(value, str):
+            parsed = parse_isodatetime(value)
+            if parsed is not None:
+                return parsed.date()
         return arrow.get(value).date()
 
 
@@ -36,9 +86,83 @@ def from_isodatetime(value, strict=False):
     :returns: The Date object or ``None``.
     """
     if value or strict:
+        if isinstance(value, str):
+            parsed = parse_isodatetime(value)
+            if parsed is not None:
+                return parsed
         return arrow.get(value).datetime
 
 
+ARROW_FORMAT_FIELDS = {
+    'YYYY': '{0.year:04d}',
+    'MM': '{0.month:02d}',
+    'M': '{0.month}',
+    'DD': '{0.day:02d}',
+    'D': '{0.day}',
+    'HH': '{0.hour:02d}',
+    'H': '{0.hour}',
+    'mm': '{0.minute:02d}',
+    'm': '{0.minute}',
+    'ss': '{0.second:02d}',
+    's': '{0.second}',
+    'SSSSSS': '{0.microsecond:06d}',
+    'ZZ': '{1}',
+    'Z': '{2}',
+}
+"""Tokens of the arrow format strings compiled by
+:func:`compile_arrow_format`, with their replacement fields."""
+
+
+def _format_utcoffset(value, separator):
+    """Format the UTC offset of a datetime as arrow does."""
+    total_minutes = int(value.utcoffset().total_seconds() / 60)
+    hours, minutes = divmod(abs(total_minutes), 60)
+    return '{0}{1:02d}{2}{3:02d}'.format(
+        '+' if total_minutes >= 0 else '-', hours, separator, minutes)
+
+
+def _escape_braces(text):
+    """Escape a literal text of a format string."""
+    return text.replace('{', '{{').replace('}', '}}')
+
+
+@lru_cache(maxsize=128)
+def compile_arrow_format(format_string):
+    """Compile an arrow format string.
+
+    The format string is tokenized once, as :meth:`arrow.Arrow.format` does,
+    into a template of replacement fields reading the datetime attributes.
+
+    :param format_string: The arrow format string, e.g. ``'YYYY/MM/DD'``.
+    :returns: A function formatting a timezone-aware datetime, or ``None`` if
+        the format string has tokens not in :data:`ARROW_FORMAT_FIELDS`
+        (e.g. month names), so that it is formatted by arrow instead.
+    """
+    template = []
+    position = 0
+    offset = False
+    for match in DateTimeFormatter._FORMAT_RE.finditer(format_string):
+        token = match.group(0)
+        if token.startswith('[') and token.endswith(']'):
+            field = _escape_braces(token[1:-1])
+        elif token in ARROW_FORMAT_FIELDS:
+            field = ARROW_FORMAT_FIELDS[token]
+            offset = offset or token in ('ZZ', 'Z')
+        else:
+            return None
+        template.append(_escape_braces(format_string[position:match.start()]))
+        template.append(field)
+        position = match.end()
+    template.append(_escape_braces(format_string[position:]))
+    template = ''.join(template)
+
+    if offset:
+        return lambda value: template.format(
+            value, _format_utcoffset(value, ':'),
+            _format_utcoffset(value, ''))
+    return template.format
+
+
 def format_arrow(value, format_string):
     """Format an arrow datetime object.
 
@@ -53,9 +177,36 @@ def format_arrow(value, format_string):
         Invenio-I18N.
     """
     assert isinstance(value, arrow.Arrow)
-    return value.format(format_string)
+    formatter = compile_arrow_format(format_string)
+    if formatter is None:
+        return value.format(format_string)
+    return formatter(value.datetime)
 
 
 def to_arrow(value):
     """Convert a Date object to an arrow datetime object."""
     return arrow.get(value)
+
+
+def memoize_date_filter(func, cache):
+    """Memoize a date filter on the date strings.
+
+    Only non-empty strings are memoized: other values, and the ``strict``
+    fallback to today, are computed on every call. The results (dates,
+    datetimes and arrow objects) are immutable, so they can be shared by
+    threads and requests.
+
+    :param func: The filter, :func:`from_isodate`, :func:`from_isodatetime`
+        or :func:`to_arrow`.
+    :param cache: The :class:`invenio_formatter.cache.LRUCache`, shared by
+        the filters.
+    :returns: The memoized filter.
+    """
+    name = func.__name__
+
+    @wraps(func)
+    def wrapper(value, *args, **kwargs):
+        if args or kwargs or not value or not isinstance(value, str):
+            return func(value, *args, **kwargs)
+        return cache.get_or_set((name, value), lambda: func(value))
+    return wrapper
@@ -0,0 +1,124 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of Invenio.
+# Copyright (C) 2020 CERN.
+#
+# Invenio is free software; you can redistribute it and/or modify it
+# under the terms of the MIT License; see LICENSE file for more details.
+
+"""Glyph tables used to measure badge texts without rendering them."""
+
+from __future__ import absolute_import, print_function
+
+from array import array
+from functools import lru_cache
+
+from PIL import ImageFont
+
+FIRST_CODEPOINT = 0x20
+"""First codepoint stored in a glyph table."""
+
+LAST_CODEPOINT = 0x7e
+"""Last codepoint stored in a glyph table."""
+
+
+@lru_cache(maxsize=None)
+def load_font(name, size):
+    """Load a TrueType font once per process.
+
+    :param name: The font name or path (e.g. ``'DejaVuSans'``).
+    :param size: The font size in points.
+    :returns: A :class:`PIL.ImageFont.FreeTypeFont` instance.
+    """
+    return ImageFont.truetype(name, size)
+
+
+def font_text_length(font, text):
+    """Measure a string by asking Pillow to lay it out.
+
+    The width is the one of the inked bounding box, extended to the left
+    when the first glyph overhangs the origin (same as the former
+    ``ImageDraw.textsize``).
+
+    :param font: A :class:`PIL.ImageFont.FreeTypeFont` instance.
+    :param text: The string to measure.
+    :returns: The width in pixels.
+    """
+    if not text:
+        return 0
+    left, _, right, _ = font.getbbox(text)
+    return right - min(left, 0)
+
+
+class GlyphTable(object):
+    """Advance-width and kerning table of a font.
+
+    Advances and kerning are stored in 26.6 fixed point, the ink extents of
+    each glyph in pixels. Strings containing codepoints outside of the table
+    are measured by Pillow.
+    """
+
+    def __init__(self, font, first=FIRST_CODEPOINT, last=LAST_CODEPOINT):
+        """Build the table.
+
+        :param font: A :class:`PIL.ImageFont.FreeTypeFont` instance.
+        :param first: First codepoint of the table.
+        :param last: Last codepoint of the table.
+        """
+        self.font = font
+        self.first = first
+        self.last = last
+        self.advances = array('l')
+        self.left = array('h')
+        self.right = array('h')
+        self.kerning = {}
+
+        chars = [chr(c) for c in range(first, last + 1)]
+        for char in chars:
+            self.advances.append(int(round(font.getlength(char) * 64)))
+            left, _, right, _ = font.getbbox(char)
+            self.left.append(left)
+            self.right.append(right)
+
+        for i, a in enumerate(chars):
+            for j, b in enumerate(chars):
+                pair = int(round(font.getlength(a + b) * 64))
+                kern = pair - self.advances[i] - self.advances[j]
+                if kern:
+                    self.kerning[ord(a), ord(b)] = kern
+
+    def measure(self, text):
+        """Measure a string.
+
+        :param text: The string to measure.
+        :returns: The width in pixels.
+        """
+        first, last = self.first, self.last
+        advances, left, right = self.advances, self.left, self.right
+        kerning = self.kerning
+        x = x_min = x_max = 0
+        previous = None
+        for char in text:
+            code = ord(char)
+            if code < first or code > last:
+                return font_text_length(self.font, text)
+            if previous is not None:
+                x += kerning.get((previous, code), 0)
+            i = code - first
+            pixel = (x + 32) >> 6
+            x_min = min(x_min, pixel + left[i])
+            x_max = max(x_max, pixel + right[i])
+            x += advances[i]
+            previous = code
+        return max(x_max, (x + 32) >> 6) - x_min
+
+
+@lru_cache(maxsize=None)
+def get_glyph_table(name, size):
+    """Get the glyph table of a font, building it on first use.
+
+    :param name: The font name or path.
+    :param size: The font size in points.
+    :returns: A :class:`GlyphTable` instance.
+    """
+    return GlyphTable(load_font(name, size))
@@ -0,0 +1,158 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of Invenio.
+# Copyright (C) 2020 CERN.
+#
+# Invenio is free software; you can redistribute it and/or modify it
+# under the terms of the MIT License; see LICENSE file for more details.
+
+"""Metrics of the formatter operations.
+
+When ``FORMATTER_METRICS_ENABLE`` is ``True``, the Jinja filters, the badge
+renders and the badge views are timed. Each measurement updates the counters
+and latency histograms of :class:`FormatterMetrics`, and sends the
+:data:`invenio_formatter.signals.operation_measured` signal. When it is
+disabled, nothing is wrapped, so there is no overhead.
+"""
+
+from __future__ import absolute_import, print_function
+
+import time
+from bisect import bisect_left
+from functools import wraps
+from threading import Lock
+
+from .signals import operation_measured
+
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25,
+           0.5, 1.0, 2.5)
+"""Upper bounds in seconds of the latency histogram buckets."""
+
+
+class _Operation(object):
+    """Measurements of an operation."""
+
+    def __init__(self):
+        """Initialize the measurements."""
+        self.buckets = [0] * (len(BUCKETS) + 1)
+        self.count = 0
+        self.duration = 0.0
+        self.size = 0
+
+
+class FormatterMetrics(object):
+    """Counters and latency histograms of the formatter operations."""
+
+    def __init__(self, caches=None):
+        """Initialize the metrics.
+
+        :param caches: Function returning the ``stats`` of the caches by
+            name, included in the Prometheus exposition.
+            (Default: ``None``)
+        """
+        self.caches = caches
+        self._operations = {}
+        self._lock = Lock()
+
+    def observe(self, operation, duration, size=None):
+        """Record a measurement and send the signal.
+
+        :param operation: The operation name.
+        :param duration: The duration in seconds.
+        :param size: The number of bytes produced. (Default: ``None``)
+        """
+        with self._lock:
+            measurements = self._operations.get(operation)
+            if measurements is None:
+                measurements = self._operations[operation] = _Operation()
+            measurements.buckets[bisect_left(BUCKETS, duration)] += 1
+            measurements.count += 1
+            measurements.duration += duration
+            if size:
+                measurements.size += size
+        operation_measured.send(
+            self, operation=operation, duration=duration, size=size)
+
+    def instrument(self, operation, func, sizeof=None):
+        """Wrap a function to measure its calls.
+
+        :param operation: The operation name.
+        :param func: The function.
+        :param sizeof: Function returning the size of a result, or ``None``.
+            (Default: ``None``)
+        :returns: The wrapped function.
+        """
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            result = func(*args, **kwargs)
+            self.observe(operation, time.perf_counter() - start,
+                         sizeof(result) if sizeof else None)
+            return result
+        return wrapper
+
+    @property
+    def stats(self):
+        """Get the count, total duration and bytes of each operation."""
+        with self._lock:
+            return dict(
+                (operation, dict(count=measurements.count,
+                                 duration=measurements.duration,
+                                 bytes=measurements.size))
+                for operation, measurements in self._operations.items()
+            )
+
+    def to_prometheus(self):
+        """Render the metrics in the Prometheus text exposition format.
+
+        :returns: The metrics text.
+        """
+        lines = [
+            '# HELP invenio_formatter_duration_seconds Duration of the '
+            'formatter operations.',
+            '# TYPE invenio_formatter_duration_seconds histogram',
+        ]
+        with self._lock:
+            operations = sorted(
+                (operation, list(measurements.buckets), measurements.count,
+                 measurements.duration, measurements.size)
+                for operation, measurements in self._operations.items())
+        for operation, buckets, count, duration, _ in operations:
+            cumulative = 0
+            for bound, observations in zip(BUCKETS + ('+Inf', ), buckets):
+                cumulative += observations
+                lines.append(
+                    'invenio_formatter_duration_seconds_bucket'
+                    '{{operation="{0}",le="{1}"}} {2}'.format(
+                        operation, bound, cumulative))
+            lines.append('invenio_formatter_duration_seconds_sum'
+                         '{{operation="{0}"}} {1!r}'.format(
+                             operation, duration))
+            lines.append('invenio_formatter_duration_seconds_count'
+                         '{{operation="{0}"}} {1}'.format(operation, count))
+
+        lines.extend([
+            '# HELP invenio_formatter_bytes_total Bytes produced by the '
+            'formatter operations.',
+            '# TYPE invenio_formatter_bytes_total counter',
+        ])
+        lines.extend(
+            'invenio_formatter_bytes_total{{operation="{0}"}} {1}'.format(
+                operation, size)
+            for operation, _, _, _, size in operations)
+
+        caches = self.caches() if self.caches else {}
+        counters = sorted(set(
+            counter for stats in caches.values() for counter in stats))
+        for counter in counters:
+            lines.extend([
+                '# HELP invenio_formatter_cache_{0} Badge cache counter.'
+                .format(counter),
+                '# TYPE invenio_formatter_cache_{0} gauge'.format(counter),
+            ])
+            lines.extend(
+                'invenio_formatter_cache_{0}{{cache="{1}"}} {2}'.format(
+                    counter, name, stats[counter])
+                for name, stats in sorted(caches.items())
+                if counter in stats)
+        return '\n'.join(lines) + '\n'
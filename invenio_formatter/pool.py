@@ -0,0 +1,125 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of Invenio.
+# Copyright (C) 2020 CERN.
+#
+# Invenio is free software; you can redistribute it and/or modify it
+# under the terms of the MIT License; see LICENSE file for more details.
+
+"""Process pool drawing PNG badges outside of the request threads."""
+
+from __future__ import absolute_import, print_function
+
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from threading import BoundedSemaphore, Lock
+
+
+def _warm(font):
+    """Load the font and build its glyph table once per pool worker."""
+    from .fonts import get_glyph_table
+    get_glyph_table(*font)
+
+
+def _draw(title, value, color, font, backend, ext):
+    """Draw a raster badge in a pool worker."""
+    from .context_processors.badges import draw_badge_image
+    return draw_badge_image(title, value, color, font, backend, ext=ext)
+
+
+class RenderPool(object):
+    """Bounded pool of processes drawing PNG badges.
+
+    :meth:`render_png` returns ``None`` instead of waiting when too many
+    badges are pending, when the pool is too slow or when it is broken, so
+    that the caller draws the badge itself. Workers are spawned (not forked)
+    on first use in each process.
+    """
+
+    def __init__(self, workers, font, backend, timeout=2.0, max_pending=16):
+        """Initialize the pool.
+
+        :param workers: Number of worker processes.
+        :param font: The ``(name, size)`` of the badge font.
+        :param backend: The PNG backend, ``'pillow'`` or ``'cairosvg'``.
+        :param timeout: Seconds to wait for a badge. (Default: ``2.0``)
+        :param max_pending: Maximum number of badges submitted at once.
+            (Default: ``16``)
+        """
+        self.workers = workers
+        self.font = tuple(font)
+        self.backend = backend
+        self.timeout = timeout
+        self.max_pending = max_pending
+        self.submitted = 0
+        self.overflows = 0
+        self.timeouts = 0
+        self.failures = 0
+        self._slots = BoundedSemaphore(max_pending)
+        self._lock = Lock()
+        self._executor = None
+        self._pid = None
+
+    def _get_executor(self):
+        """Get the executor of the current process."""
+        with self._lock:
+            if self._executor is None or self._pid != os.getpid():
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context('spawn'),
+                    initializer=_warm,
+                    initargs=(self.font, ),
+                )
+                self._pid = os.getpid()
+            return self._executor
+
+    def render_png(self, title, value, color, ext='png'):
+        """Draw a raster badge in the pool.
+
+        :param title: The badge title.
+        :param value: The badge content.
+        :param color: The badge color.
+        :param ext: The badge format, e.g. ``'png'`` or ``'webp@2x'``.
+            (Default: ``'png'``)
+        :returns: The badge, or ``None`` if it must be drawn inline.
+        """
+        if not self._slots.acquire(blocking=False):
+            self.overflows += 1
+            return None
+        try:
+            executor = self._get_executor()
+            future = executor.submit(
+                _draw, title, value, color, self.font, self.backend, ext)
+            self.submitted += 1
+            return future.result(timeout=self.timeout)
+        except FutureTimeoutError:
+            future.cancel()
+            self.timeouts += 1
+        except BrokenProcessPool:
+            with self._lock:
+                if self._executor is executor:
+                    self._executor = None
+            self.failures += 1
+        finally:
+            self._slots.release()
+        return None
+
+    def shutdown(self):
+        """Stop the worker processes."""
+        with self._lock:
+            if self._executor is not None and self._pid == os.getpid():
+                self._executor.shutdown(wait=False)
+            self._executor = None
+
+    @property
+    def stats(self):
+        """Get the pool counters."""
+        return dict(
+            submitted=self.submitted,
+            overflows=self.overflows,
+            timeouts=self.timeouts,
+            failures=self.failures,
+        )
@@ -0,0 +1,210 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of Invenio.
+# Copyright (C) 2020 CERN.
+#
+# Invenio is free software; you can redistribute it and/or modify it
+# under the terms of the MIT License; see LICENSE file for more details.
+
+"""Profiler of the template macros and formatter filters.
+
+When ``FORMATTER_PROFILER_ENABLE`` is ``True``, the time spent in each Jinja
+macro (e.g. ``meta_highwire``) and in each formatter filter is collected for
+a sample of the requests (``FORMATTER_PROFILER_SAMPLE_RATE``). The timings of
+a request are:
+
+- sent in a ``Server-Timing`` response header, shown by the browser
+  developer tools (``FORMATTER_PROFILER_HEADER``);
+- logged at the debug level;
+- appended as a JSON line to ``FORMATTER_PROFILER_LOG``, if set, to be
+  aggregated by ``<cli> formatter profile report``.
+
+Macros are timed by :class:`MacroProfilerExtension`, which instruments the
+``{% macro %}`` blocks of the templates compiled after the profiler is
+enabled. Nested macro calls are included in the time of the caller.
+"""
+
+from __future__ import absolute_import, print_function
+
+import json
+import random
+import time
+from functools import wraps
+from threading import Lock
+
+from flask import current_app, g, has_request_context, request
+from jinja2.ext import Extension
+from jinja2.lexer import Token
+
+_log_lock = Lock()
+
+
+def start_timer(name):
+    """Start timing a macro or filter call of a profiled request.
+
+    :param name: The profiled name, e.g. ``'macro.meta_highwire'``.
+    :returns: A token for :func:`stop_timer`, or ``None`` when the current
+        request is not profiled.
+    """
+    if has_request_context() and g.get('formatter_profile') is not None:
+        return name, time.perf_counter()
+
+
+def stop_timer(token):
+    """Record a call timed by :func:`start_timer`.
+
+    :param token: The token returned by :func:`start_timer`.
+    :returns: An empty string, so that it can be output by templates.
+    """
+    if token is not None:
+        name, start = token
+        timings = g.formatter_profile.setdefault(name, [0, 0.0])
+        timings[0] += 1
+        timings[1] += time.perf_counter() - start
+    return ''
+
+
+def profile_filter(name, func):
+    """Wrap a filter to time its calls.
+
+    :param name: The filter name.
+    :param func: The filter function.
+    :returns: The wrapped filter.
+    """
+    key = 'filter.{0}'.format(name)
+
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        token = start_timer(key)
+        try:
+            return func(*args, **kwargs)
+        finally:
+            stop_timer(token)
+    return wrapper
+
+
+class MacroProfilerExtension(Extension):
+    """Jinja extension timing the calls of the template macros."""
+
+    def __init__(self, environment):
+        """Add the timer functions to the environment."""
+        super(MacroProfilerExtension, self).__init__(environment)
+        environment.globals.update(
+            _formatter_start_timer=start_timer,
+            _formatter_stop_timer=stop_timer,
+        )
+
+    def filter_stream(self, stream):
+        """Insert timer calls at the start and end of the macro bodies."""
+        tokens = list(stream)
+        macros = []
+        index = 0
+        while index < len(tokens):
+            token = tokens[index]
+            keyword = tokens[index + 1].value \
+                if token.type == 'block_begin' and \
+                index + 1 < len(tokens) and \
+                tokens[index + 1].type == 'name' else None
+            if keyword == 'endmacro' and macros:
+                variable = '_formatter_timer_{0}'.format(len(macros))
+                macros.pop()
+                for item in self._tokens(token.lineno, [
+                        ('variable_begin', '{{'),
+                        ('name', '_formatter_stop_timer'),
+                        ('lparen', '('), ('name', variable), ('rparen', ')'),
+                        ('variable_end', '}}')]):
+                    yield item
+            yield token
+            index += 1
+            if keyword == 'macro':
+                name = tokens[index + 1].value
+                while tokens[index].type != 'block_end':
+                    yield tokens[index]
+                    index += 1
+                yield tokens[index]
+                index += 1
+                macros.append(name)
+                variable = '_formatter_timer_{0}'.format(len(macros))
+                for item in self._tokens(token.lineno, [
+                        ('block_begin', '{%'), ('name', 'set'),
+                        ('name', variable), ('assign', '='),
+                        ('name', '_formatter_start_timer'), ('lparen', '('),
+                        ('string', 'macro.{0}'.format(name)),
+                        ('rparen', ')'), ('block_end', '%}')]):
+                    yield item
+
+    @staticmethod
+    def _tokens(lineno, items):
+        """Create tokens."""
+        return [Token(lineno, kind, value) for kind, value in items]
+
+
+def _before_request():
+    """Start profiling a sample of the requests."""
+    if random.random() < current_app.config['FORMATTER_PROFILER_SAMPLE_RATE']:
+        g.formatter_profile = {}
+        g.formatter_profile_start = time.perf_counter()
+
+
+def _after_request(response):
+    """Report the timings of a profiled request."""
+    profile = g.pop('formatter_profile', None)
+    if profile is None:
+        return response
+    duration = time.perf_counter() - g.pop('formatter_profile_start')
+    config = current_app.config
+    if config['FORMATTER_PROFILER_HEADER']:
+        response.headers.add('Server-Timing', ', '.join(
+            '{0};dur={1:.3f};desc="{2} calls"'.format(
+                name, seconds * 1000, calls)
+            for name, (calls, seconds) in sorted(profile.items())) or
+            'formatter;dur=0')
+    current_app.logger.debug('Formatter profile of %s: %s', request.path,
+                             profile)
+    if config['FORMATTER_PROFILER_LOG']:
+        line = json.dumps(dict(
+            path=request.path, duration=duration, timings=profile,
+        ), sort_keys=True)
+        with _log_lock, open(config['FORMATTER_PROFILER_LOG'], 'a') as fp:
+            fp.write(line + '\n')
+    return response
+
+
+def init_profiler(app, filters):
+    """Enable the profiler on an application.
+
+    :param app: The Flask application.
+    :param filters: The names of the filters to profile.
+    """
+    app.jinja_env.add_extension(MacroProfilerExtension)
+    for name in filters:
+        app.jinja_env.filters[name] = profile_filter(
+            name, app.jinja_env.filters[name])
+    app.before_request(_before_request)
+    app.after_request(_after_request)
+
+
+def aggregate_profiles(lines):
+    """Aggregate the profiles logged in ``FORMATTER_PROFILER_LOG``.
+
+    :param lines: The JSON lines.
+    :returns: The number of requests, their total duration, and the list of
+        ``(name, requests, calls, seconds)`` sorted by decreasing time.
+    """
+    requests = 0
+    duration = 0.0
+    totals = {}
+    for line in lines:
+        if not line.strip():
+            continue
+        profile = json.loads(line)
+        requests += 1
+        duration += profile['duration']
+        for name, (calls, seconds) in profile['timings'].items():
+            total = totals.setdefault(name, [0, 0, 0.0])
+            total[0] += 1
+            total[1] += calls
+            total[2] += seconds
+    return requests, duration, sorted(
+        ((name, ) + tuple(total) for name, total in totals.items()),
+        key=lambda item: item[3], reverse=True)
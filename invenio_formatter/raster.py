@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of Invenio.
+# Copyright (C) 2020 CERN.
+#
+# Invenio is free software; you can redistribute it and/or modify it
+# under the terms of the MIT License; see LICENSE file for more details.
+
+"""Badge rasterizer drawing the SVG badge shapes directly with Pillow."""
+
+from __future__ import absolute_import, print_function
+
+from io import BytesIO
+
+from PIL import Image, ImageColor, ImageDraw
+
+SUPERSAMPLING = 4
+"""Supersampling factor used to antialias the rounded corners."""
+
+
+def _rounded_mask(width, height, radius):
+    """Create the antialiased mask of a rounded rectangle."""
+    mask = Image.new('L', (width * SUPERSAMPLING, height * SUPERSAMPLING), 0)
+    ImageDraw.Draw(mask).rounded_rectangle(
+        (0, 0, width * SUPERSAMPLING - 1, height * SUPERSAMPLING - 1),
+        radius=radius * SUPERSAMPLING, fill=255)
+    return mask.resize((width, height), Image.LANCZOS)
+
+
+def _gradient(width, height):
+    """Create the overlay gradient, from ``#bbb`` to black at 10% opacity."""
+    column = Image.new('RGBA', (1, height))
+    for y in range(height):
+        level = int(round(0xbb * (1 - (y + 0.5) / height)))
+        column.putpixel((0, y), (level, level, level, 26))
+    return column.resize((width, height))
+
+
+def rasterize_badge(title, value, color, font, title_length, value_length,
+                    scale=1, fmt='png'):
+    """Draw a badge and encode it in PNG or lossless WebP.
+
+    The geometry is the one of
+    :func:`invenio_formatter.context_processors.badges.generate_badge_svg`.
+
+    :param title: The badge title.
+    :param value: The badge content.
+    :param color: The badge color.
+    :param font: The :class:`PIL.ImageFont.FreeTypeFont` used to measure the
+        texts, at ``scale`` times their size.
+    :param title_length: The width of the title at scale 1.
+    :param value_length: The width of the value at scale 1.
+    :param scale: The scale factor. (Default: ``1``)
+    :param fmt: The image format, ``'png'`` or ``'webp'``.
+        (Default: ``'png'``)
+    :returns: The image bytes.
+    """
+    title_width = (title_length + 11) * scale
+    width = (title_length + value_length + 22) * scale
+    height = 20 * scale
+
+    image = Image.new('RGBA', (width, height), (0x55, 0x55, 0x55, 255))
+    draw = ImageDraw.Draw(image)
+    draw.rectangle((title_width, 0, width, height),
+                   fill=ImageColor.getrgb(color))
+    image.alpha_composite(_gradient(width, height))
+
+    title_position = (title_length / 2 + 6) * scale
+    value_position = (title_length + value_length / 2 + 16) * scale
+    for offset, fill in ((15, (1, 1, 1, 77)), (14, (255, 255, 255, 255))):
+        overlay = Image.new('RGBA', (width, height), fill[:3] + (0, ))
+        text = ImageDraw.Draw(overlay)
+        text.text((title_position, offset * scale), title, font=font,
+                  fill=fill, anchor='ms')
+        text.text((value_position, offset * scale), value, font=font,
+                  fill=fill, anchor='ms')
+        image.alpha_composite(overlay)
+
+    image.putalpha(_rounded_mask(width, height, 3 * scale))
+    return encode_image(image, fmt)
+
+
+def encode_image(image, fmt):
+    """Encode a badge image.
+
+    :param image: The :class:`PIL.Image.Image`.
+    :param fmt: The image format, ``'png'`` or ``'webp'`` (lossless).
+    :returns: The image bytes.
+    """
+    output = BytesIO()
+    if fmt == 'webp':
+        image.save(output, 'WEBP', lossless=True, quality=100, method=6)
+    else:
+        image.save(output, 'PNG')
+    return output.getvalue()
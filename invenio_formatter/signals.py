@@ -0,0 +1,36 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of Invenio.
+# Copyright (C) 2020 CERN.
+#
+# Invenio is free software; you can redistribute it and/or modify it
+# under the terms of the MIT License; see LICENSE file for more details.
+
+"""Signals of Invenio-Formatter."""
+
+from __future__ import absolute_import, print_function
+
+from blinker import Namespace
+
+_signals = Namespace()
+
+operation_measured = _signals.signal('operation-measured')
+"""Signal sent for each measured formatter operation.
+
+Only sent when ``FORMATTER_METRICS_ENABLE`` is ``True``. The sender is the
+:class:`invenio_formatter.metrics.FormatterMetrics` of the application.
+
+Parameters:
+
+- ``operation`` - the operation name, e.g. ``'filter.sanitize_html'``,
+  ``'badge.render.png'`` or ``'badge.view'``.
+- ``duration`` - the duration in seconds.
+- ``size`` - the number of bytes produced, or ``None``.
+
+Example receiver:
+
+.. code-block:: python
+
+   def receiver(sender, operation=None, duration=None, size=None):
+       # ...
+"""
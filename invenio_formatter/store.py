@@ -0,0 +1,311 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of Invenio.
+# Copyright (C) 2020 CERN.
+#
+# Invenio is free software; you can redistribute it and/or modify it
+# under the terms of the MIT License; see LICENSE file for more details.
+
+"""Badge store shared by the worker processes of a node.
+
+The store is an append-only file mapped in memory by every worker, so
+rendered badges live once in the page cache of the node instead of once per
+process, and survive worker recycling.
+
+The file starts with a header holding a namespace tag (e.g. the renderer
+version and font) and the end offset of the last record, followed by records
+made of a fixed-size head (magic, CRC, key and value lengths), the key and
+the value. Writers append under an exclusive lock on a sibling ``.lock`` file
+and move the end offset only once the record is written, so readers never
+need a lock. When the file is full it is compacted into a new file, keeping
+the most recently appended badges, which replaces the old one atomically.
+The old file is then flagged as replaced so that the other workers reopen
+the new one on their next lookup. A file written with another namespace is
+discarded.
+"""
+
+from __future__ import absolute_import, print_function
+
+import fcntl
+import hashlib
+import mmap
+import os
+import struct
+from contextlib import contextmanager
+from threading import RLock
+from zlib import crc32
+
+HEADER = struct.Struct('<8sII16sQ')
+"""File header: magic, version, replaced flag, namespace tag, end offset."""
+
+RECORD = struct.Struct('<4sIII')
+"""Record head: magic, CRC of key and value, key and value lengths."""
+
+RENDER_LOCK_SLOTS = 4096
+"""Number of byte-range locks of the render lock file, hashed by key."""
+
+MAGIC = b'IFBADGES'
+VERSION = 1
+RECORD_MAGIC = b'BDG1'
+
+
+class BadgeStore(object):
+    """Memory-mapped badge store."""
+
+    def __init__(self, path, capacity=64 * 1024 * 1024, namespace='',
+                 render_locks=False):
+        """Initialize the store.
+
+        The file is opened lazily, once per process.
+
+        :param path: Path of the store file.
+        :param capacity: Size of the store file in bytes. An existing larger
+            file is used with its own size.
+        :param namespace: Identifies what produced the badges, e.g. the
+            renderer version and the font. Files written with another
+            namespace are discarded. (Default: ``''``)
+        :param render_locks: Enable :meth:`render_lock`. (Default:
+            ``False``)
+        """
+        self.path = path
+        self.capacity = capacity
+        self.tag = hashlib.md5(namespace.encode('utf-8')).digest()
+        self.hits = 0
+        self.misses = 0
+        self.compactions = 0
+        self._lock = RLock()
+        self._pid = None
+        self._writing = False
+        self._mmap = None
+        self._size = capacity
+        self._inode = None
+        self._index = {}
+        self._scanned = HEADER.size
+        self.render_locks = render_locks
+        self._render_lock_file = None
+
+    @staticmethod
+    def encode_key(key):
+        """Encode a key tuple (e.g. title, value, color and format)."""
+        return u'\0'.join(key).encode('utf-8')
+
+    def get(self, key):
+        """Get a badge.
+
+        The badge is copied out of the mapping, which may be closed when the
+        file is replaced by a compaction.
+
+        :param key: The badge key, a tuple of strings.
+        :returns: The badge bytes or ``None``.
+        """
+        key = self.encode_key(key)
+        with self._lock:
+            self._ensure_open()
+            if self._replaced():
+                self._refresh()
+            location = self._index.get(key)
+            if location is None:
+                self._refresh()
+                location = self._index.get(key)
+            if location is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            start, end = location
+            return self._mmap[start:end]
+
+    def set(self, key, value):
+        """Append a badge.
+
+        :param key: The badge key, a tuple of strings.
+        :param value: The badge bytes.
+        """
+        key = self.encode_key(key)
+        size = RECORD.size + len(key) + len(value)
+        if HEADER.size + size > self.capacity:
+            return
+        with self._lock, self._writer_lock():
+            self._ensure_open()
+            self._refresh()
+            if key in self._index:
+                return
+            end = self._end()
+            if end + size > self._size:
+                self._compact(self._size // 2 - size)
+                end = self._end()
+            self._mmap[end:end + size] = RECORD.pack(
+                RECORD_MAGIC, crc32(key + value), len(key), len(value),
+            ) + key + value
+            self._write_header(end + size)
+            self._refresh()
+
+    def clear(self):
+        """Remove all badges."""
+        with self._lock, self._writer_lock():
+            self._ensure_open()
+            self._compact(0)
+
+    @contextmanager
+    def render_lock(self, key):
+        """Hold the render lock of a key, shared by all processes.
+
+        A process rendering a badge holds its lock, so that the other
+        processes wait for the badge to be stored instead of rendering it
+        too. Keys are hashed on a fixed number of byte-range locks of a
+        sibling ``.render.lock`` file, so unrelated keys may wait for each
+        other. POSIX locks are per process, so threads of a process are not
+        excluded (see :class:`invenio_formatter.cache.SingleFlight`). It does
+        nothing unless ``render_locks`` is enabled.
+
+        :param key: The badge key, a tuple of strings.
+        """
+        if not self.render_locks:
+            yield
+            return
+        with self._lock:
+            if self._render_lock_file is None:
+                self._ensure_open()
+                self._render_lock_file = open(self.path + '.render.lock', 'a')
+        fd = self._render_lock_file.fileno()
+        slot = crc32(self.encode_key(key)) % RENDER_LOCK_SLOTS
+        fcntl.lockf(fd, fcntl.LOCK_EX, 1, slot)
+        try:
+            yield
+        finally:
+            fcntl.lockf(fd, fcntl.LOCK_UN, 1, slot)
+
+    @property
+    def stats(self):
+        """Get the store counters of the current process."""
+        with self._lock:
+            self._ensure_open()
+            self._refresh()
+            return dict(
+                entries=len(self._index),
+                bytes=self._end(),
+                hits=self.hits,
+                misses=self.misses,
+                compactions=self.compactions,
+            )
+
+    @contextmanager
+    def _writer_lock(self):
+        """Hold the lock of the writers of all processes."""
+        if self._writing:
+            yield
+            return
+        with open(self.path + '.lock', 'a') as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            self._writing = True
+            try:
+                yield
+            finally:
+                self._writing = False
+
+    def _ensure_open(self):
+        """Open the file, again after a fork."""
+        if self._pid != os.getpid():
+            self._open()
+
+    def _open(self):
+        """Map the store file, creating it if needed."""
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        if self._mmap is not None:
+            self._mmap.close()
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        with os.fdopen(fd, 'r+b') as fp:
+            self._size = os.fstat(fp.fileno()).st_size
+            if self._size < self.capacity:
+                fp.truncate(self.capacity)
+                self._size = self.capacity
+            self._mmap = mmap.mmap(fp.fileno(), self._size)
+            self._inode = os.fstat(fp.fileno()).st_ino
+        if not self._valid():
+            with self._writer_lock():
+                if not self._valid():
+                    self._write_header(HEADER.size)
+        self._pid = os.getpid()
+        self._index = {}
+        self._scanned = HEADER.size
+
+    def _valid(self):
+        """Check the header of the mapped file."""
+        magic, version, _, tag, end = HEADER.unpack_from(self._mmap)
+        return magic == MAGIC and version == VERSION and \
+            tag == self.tag and HEADER.size <= end <= self._size
+
+    def _replaced(self):
+        """Check if the mapped file was replaced by a compaction."""
+        return HEADER.unpack_from(self._mmap)[2] != 0
+
+    def _end(self):
+        """Get the end offset of the last record."""
+        return HEADER.unpack_from(self._mmap)[4]
+
+    def _write_header(self, end, replaced=0):
+        """Publish the records written before ``end``."""
+        HEADER.pack_into(
+            self._mmap, 0, MAGIC, VERSION, replaced, self.tag, end)
+
+    def _refresh(self):
+        """Index the records appended or compacted by other processes."""
+        try:
+            replaced = os.stat(self.path).st_ino != self._inode
+        except OSError:
+            replaced = True
+        if replaced or self._replaced() or not self._valid():
+            self._open()
+        end = self._end()
+        if end < self._scanned:
+            self._index = {}
+            self._scanned = HEADER.size
+        offset = self._scanned
+        while offset + RECORD.size <= end:
+            magic, checksum, key_size, value_size = RECORD.unpack_from(
+                self._mmap, offset)
+            if magic != RECORD_MAGIC:
+                break
+            start = offset + RECORD.size
+            key = self._mmap[start:start + key_size]
+            value_start = start + key_size
+            value_end = value_start + value_size
+            if crc32(self._mmap[value_start:value_end], crc32(key)) == \
+                    checksum:
+                self._index[key] = (value_start, value_end)
+            offset = value_end
+        self._scanned = offset
+
+    def _compact(self, max_size):
+        """Replace the file keeping the most recent records.
+
+        Must be called with the writer lock held.
+
+        :param max_size: Maximum size of the kept records.
+        """
+        records = sorted(
+            self._index.items(), key=lambda item: item[1][0], reverse=True)
+        kept = []
+        size = 0
+        for key, (start, end) in records:
+            record_size = RECORD.size + len(key) + end - start
+            if size + record_size > max_size:
+                break
+            kept.append((key, self._mmap[start:end]))
+            size += record_size
+
+        tmp = '{0}.{1}.tmp'.format(self.path, os.getpid())
+        with open(tmp, 'wb') as fp:
+            fp.write(HEADER.pack(
+                MAGIC, VERSION, 0, self.tag, HEADER.size + size))
+            for key, value in reversed(kept):
+                fp.write(RECORD.pack(
+                    RECORD_MAGIC, crc32(key + value), len(key), len(value),
+                ) + key + value)
+            fp.truncate(self._size)
+        os.replace(tmp, self.path)
+        self._write_header(self._end(), replaced=1)
+        self.compactions += 1
+        self._open()
+        self._refresh()
@@ -10,21 +10,39 @@
 
 from __future__ import absolute_import, print_function
 
-import hashlib
+import re
+import time
 from datetime import datetime as dt
 from datetime import timedelta
 
-from flask import Blueprint, Response, current_app, request
+from flask import Blueprint, Response, abort, current_app, g, request
 
+from .admission import RenderRejected
 
-def create_badge_blueprint(allowed_types):
+BADGE_MIMETYPES = {
+    'svg': 'image/svg+xml',
+    'png': 'image/png',
+    'webp': 'image/webp',
+}
+"""Mimetype of each badge format."""
+
+SCALE_SUFFIX = re.compile(r'^(.+)@([0-9]+)x$')
+"""Scale suffix of the raster badge values, e.g. ``@2x``."""
+
+
+def create_badge_blueprint(allowed_types, metrics=None, metrics_route=False):
     """Create the badge blueprint.
 
     :param allowed_types: A list of allowed types.
+    :param metrics: The :class:`invenio_formatter.metrics.FormatterMetrics`
+        measuring the badge views, or ``None``. (Default: ``None``)
+    :param metrics_route: Expose the metrics at ``/badges/metrics``.
+        (Default: ``False``)
     :returns: A Flask blueprint.
     """
-    from invenio_formatter.context_processors.badges import \
-        generate_badge_png, generate_badge_svg
+    from invenio_formatter.context_processors.badges import BADGE_SCALES, \
+        badge_etag, compress_badge, generate_badge_sprite, \
+        get_badge_encodings, render_badge_encoded
 
     blueprint = Blueprint(
         'invenio_formatter_badges',
@@ -33,35 +51,207 @@ def create_badge_blueprint(allowed_types):
     )
 
     @blueprint.route(
-        '/badge/<any({0}):title>/<path:value>.<any(svg, png):ext>'.format(
-            ', '.join(allowed_types)))
+        '/badge/<any({0}):title>/<path:value>.<any(svg, png, webp):ext>'
+        .format(', '.join(allowed_types)))
     def badge(title, value, ext='svg'):
-        """Generate a badge response."""
-        if ext == 'svg':
-            generator = generate_badge_svg
-            mimetype = 'image/svg+xml'
-        elif ext == 'png':
-            generator = generate_badge_png
-            mimetype = 'image/png'
+        """Generate a badge response.
 
+        Raster badges are scaled with a ``@<scale>x`` suffix, e.g.
+        ``/badge/DOI/10.1234/a@2x.png``. PNG badges are sent as WebP to the
+        clients accepting it (see ``FORMATTER_BADGES_NEGOTIATE_WEBP``).
+        """
+        mimetype = BADGE_MIMETYPES[ext]
         badge_title_mapping = \
             current_app.config['FORMATTER_BADGES_TITLE_MAPPING'].get(
                 title, title)
-        response = Response(generator(badge_title_mapping, value),
-                            mimetype=mimetype)
-        # Generate Etag from badge title and value.
-        hashable_badge = "{0}.{1}".format(badge_title_mapping,
-                                          value).encode('utf-8')
-        response.set_etag(hashlib.sha1(hashable_badge).hexdigest())
+        _check_lengths([(badge_title_mapping, value)])
+        vary = []
+        if ext != 'svg':
+            scale = 1
+            match = SCALE_SUFFIX.match(value)
+            if match:
+                value, scale = match.group(1), int(match.group(2))
+                if scale not in BADGE_SCALES:
+                    abort(404)
+            if ext == 'png' and \
+                    current_app.config['FORMATTER_BADGES_NEGOTIATE_WEBP']:
+                vary.append('Accept')
+                if _accepts_webp():
+                    ext, mimetype = 'webp', BADGE_MIMETYPES['webp']
+            if scale > 1:
+                ext = '{0}@{1}x'.format(ext, scale)
+
+        return _badge_response(
+            badge_etag(badge_title_mapping, value, ext),
+            mimetype,
+            lambda encoding: render_badge_encoded(
+                badge_title_mapping, value, ext=ext, encoding=encoding),
+            get_badge_encodings() if ext == 'svg' else [],
+            vary,
+        )
+
+    @blueprint.route('/badges.<any(svg, png):ext>')
+    def badges(ext='svg'):
+        """Generate a sprite of the badges given by ``badge`` arguments.
+
+        Each ``badge`` query argument is a ``<title>/<value>`` pair, e.g.
+        ``/badges.svg?badge=DOI/10.1234/a&badge=DOI/10.1234/b``. In the SVG
+        sprite, badges are addressable with ``#badge-<position>``.
+        """
+        mapping = current_app.config['FORMATTER_BADGES_TITLE_MAPPING']
+        items = []
+        for argument in request.args.getlist('badge'):
+            title, _, value = argument.partition('/')
+            if title not in allowed_types or not value:
+                abort(400)
+            items.append((mapping.get(title, title), value))
+        if not items or len(items) > \
+                current_app.config['FORMATTER_BADGES_SPRITE_MAX_BADGES']:
+            abort(400)
+        _check_lengths(items)
+
+        def render(encoding):
+            sprite = generate_badge_sprite(items, ext)
+            if encoding:
+                return compress_badge(sprite, encoding)
+            return sprite
+
+        return _badge_response(
+            badge_etag('sprite', ext, *[part for item in items
+                                        for part in item]),
+            'image/svg+xml' if ext == 'svg' else 'image/png',
+            render,
+            get_badge_encodings() if ext == 'svg' else [],
+        )
+
+    if metrics is not None:
+        @blueprint.before_request
+        def start_timer():
+            """Start measuring a badge view."""
+            g.formatter_badge_start = time.perf_counter()
+
+        @blueprint.after_request
+        def measure(response):
+            """Measure a badge view."""
+            start = g.pop('formatter_badge_start', None)
+            if start is not None and request.endpoint != \
+                    'invenio_formatter_badges.metrics':
+                metrics.observe('badge.view', time.perf_counter() - start,
+                                response.calculate_content_length())
+            return response
+
+        if metrics_route:
+            @blueprint.route('/badges/metrics', endpoint='metrics')
+            def metrics_view():
+                """Expose the metrics in the Prometheus text format."""
+                return Response(metrics.to_prometheus(),
+                                mimetype='text/plain; version=0.0.4')
+
+    @blueprint.errorhandler(RenderRejected)
+    def render_rejected(error):
+        """Answer quickly when too many badges are being rendered."""
+        response = Response('Too many badges are being rendered.',
+                            status=503, mimetype='text/plain')
+        response.retry_after = \
+            current_app.config['FORMATTER_BADGES_RETRY_AFTER']
+        response.cache_control.no_store = True
+        return response
+
+    return blueprint
+
+
+def _check_lengths(items):
+    """Reject the requests with too long badge titles or values.
+
+    :param items: The ``(mapped title, value)`` of the requested badges.
+    """
+    max_title_length = current_app.config['FORMATTER_BADGES_MAX_TITLE_LENGTH']
+    max_value_length = current_app.config['FORMATTER_BADGES_MAX_VALUE_LENGTH']
+    for title, value in items:
+        if len(title) > max_title_length or len(value) > max_value_length:
+            current_app.extensions['invenio-formatter'] \
+                .badge_admission.too_long += 1
+            abort(414)
+
+
+def _accepts_webp():
+    """Check if the client explicitly accepts WebP images."""
+    return any(value == 'image/webp' and quality > 0
+               for value, quality in request.accept_mimetypes)
+
+
+def _badge_response(etag, mimetype, render, encodings=(), vary=()):
+    """Create a badge response, rendering the badge only if needed.
+
+    The content encoding is negotiated with ``Accept-Encoding`` among
+    ``encodings``, and each encoding has its own ETag. The badge is not
+    rendered for ``HEAD`` requests and when the ETag matches
+    ``If-None-Match``.
+
+    :param etag: The ETag of the uncompressed badge.
+    :param mimetype: The mimetype of the badge.
+    :param render: Function rendering the badge, called with the content
+        encoding (``None`` for the uncompressed badge).
+    :param encodings: The available content encodings, by order of
+        preference. (Default: ``()``)
+    :param vary: The other request headers the response depends on.
+        (Default: ``()``)
+    :returns: The response, conditional to the request.
+    """
+    encoding = request.accept_encodings.best_match(encodings)
+    if encoding:
+        etag = '{0}-{1}'.format(etag, encoding)
+    if request.method == 'HEAD' or request.if_none_match.contains_weak(etag):
+        response = Response(mimetype=mimetype)
+        del response.headers['Content-Length']
+    else:
+        response = Response(render(encoding), mimetype=mimetype)
+    for header in vary:
+        response.vary.add(header)
+    if encodings:
+        response.vary.add('Accept-Encoding')
+    if encoding:
+        response.content_encoding = encoding
+    response.set_etag(etag)
+    _set_cache_policy(response)
+    return response.make_conditional(request)
+
+
+def _set_cache_policy(response):
+    """Set the cache headers of a badge response.
+
+    See ``FORMATTER_BADGES_CACHE_POLICY``.
+    """
+    from invenio_formatter.context_processors.badges import \
+        BADGE_RENDERER_DATE
+
+    config = current_app.config
+    policy = config['FORMATTER_BADGES_CACHE_POLICY']
+    max_age = config['FORMATTER_BADGES_MAX_CACHE_AGE']
+    if policy == 'no-cache':
         # Add headers to prevent caching.
         response.headers["Pragma"] = "no-cache"
         response.cache_control.no_cache = True
-        response.cache_control.max_age = \
-            current_app.config['FORMATTER_BADGES_MAX_CACHE_AGE']
+        response.cache_control.max_age = max_age
         response.last_modified = dt.utcnow()
-        extra = timedelta(
-            seconds=current_app.config['FORMATTER_BADGES_MAX_CACHE_AGE'])
+        extra = timedelta(seconds=max_age)
         response.expires = response.last_modified + extra
-        return response.make_conditional(request)
+        return
 
-    return blueprint
+    response.cache_control.public = True
+    response.last_modified = BADGE_RENDERER_DATE
+    if policy == 'immutable':
+        max_age = 365 * 24 * 3600
+        response.cache_control.immutable = True
+    elif policy == 'public':
+        shared_max_age = config['FORMATTER_BADGES_SHARED_MAX_AGE']
+        if shared_max_age is not None:
+            response.cache_control.s_maxage = shared_max_age
+        stale = config['FORMATTER_BADGES_STALE_WHILE_REVALIDATE']
+        if stale is not None:
+            response.cache_control.stale_while_revalidate = stale
+    else:
+        raise ValueError(
+            'Invalid FORMATTER_BADGES_CACHE_POLICY: {0}'.format(policy))
+    response.cache_control.max_age = max_age
+    response.expires = dt.utcnow() + timedelta(seconds=max_age)
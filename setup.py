@@ -30,16 +30,19 @@ extras_require = {
     'docs': [
         'Sphinx>=1.8.0',
     ],
+    'badges': [
+        'Pillow>=8.2.0',
+    ],
+    'brotli': [
+        'Brotli>=1.0.0',
+    ],
     # CairoSVG 2.0.0 only supports Python 3
-    'badges:python_version<"3.0"': [
+    'cairosvg:python_version<"3.0"': [
         'CairoSVG>=1.0.20,<2.0.0',
     ],
-    'badges:python_version>="3.0"': [
+    'cairosvg:python_version>="3.0"': [
         'CairoSVG>=1.0.20',
     ],
-    'badges': [
-        'Pillow>=3.2.0',
-    ],
     'tests': tests_require,
 }
 
@@ -55,6 +58,7 @@ setup_requires = [
 
 install_requires = [
     'bleach>=3.1.0',
+    'blinker>=1.4',
     'Flask>=0.11.1',
     'arrow>=0.7.0',
     'Flask-BabelEx>=0.9.2',
@@ -91,6 +95,9 @@ setup(
         'invenio_i18n.translations': [
             'messages = invenio_formatter',
         ],
+        'flask.commands': [
+            'formatter = invenio_formatter.cli:formatter',
+        ],
     },
     extras_require=extras_require,
     install_requires=install_requires,
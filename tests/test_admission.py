@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of Invenio.
+# Copyright (C) 2020 CERN.
+#
+# Invenio is free software; you can redistribute it and/or modify it
+# under the terms of the MIT License; see LICENSE file for more details.
+
+"""Test the admission control of the badge renders."""
+
+from __future__ import absolute_import, print_function
+
+from threading import Thread
+
+import pytest
+
+from invenio_formatter.admission import RenderAdmission, RenderRejected
+
+
+def test_admission_queue():
+    """Test renders are queued, then rejected."""
+    admission = RenderAdmission(1, max_queued=1, timeout=0.05)
+    with admission.slot():
+        # The queue has room, but the slot is not released in time.
+        with pytest.raises(RenderRejected):
+            with admission.slot():
+                pass
+        assert admission.stats['timeouts'] == 1
+
+        # The queue is full.
+        admission.max_queued = 0
+        with pytest.raises(RenderRejected):
+            with admission.slot():
+                pass
+        assert admission.stats['rejected'] == 1
+
+    # A queued render gets the slot once it is released.
+    admission.max_queued = 1
+    admission.timeout = 5
+
+    def render():
+        with admission.slot():
+            pass
+
+    with admission.slot():
+        waiter = Thread(target=render)
+        waiter.start()
+    waiter.join()
+    assert admission.stats['queued'] == 2
+    assert admission.stats['admitted'] == 3
+
+
+def test_admission_unlimited():
+    """Test admission without limit."""
+    admission = RenderAdmission(0)
+    with admission.slot():
+        with admission.slot():
+            pass
+    assert admission.stats['admitted'] == 2
+
+
+def test_admission_views(app):
+    """Test the badge views answer 414 and 503."""
+    admission = app.extensions['invenio-formatter'].badge_admission
+    app.config['FORMATTER_BADGES_MAX_VALUE_LENGTH'] = 8
+    with app.test_client() as client:
+        response = client.get('/badge/DOI/{0}.svg'.format('x' * 9))
+        assert response.status_code == 414
+        response = client.get('/badges.svg?badge=DOI/{0}'.format('x' * 9))
+        assert response.status_code == 414
+        assert admission.stats['too_long'] == 2
+
+        admission = RenderAdmission(1, max_queued=0)
+        app.extensions['invenio-formatter'].badge_admission = admission
+        with admission.slot():
+            response = client.get('/badge/DOI/value.svg')
+            assert response.status_code == 503
+            assert response.headers['Retry-After'] == '1'
+            assert admission.stats['rejected'] == 1
+
+        response = client.get('/badge/DOI/value.svg')
+        assert response.status_code == 200
+        # Cached badges are not limited.
+        with admission.slot():
+            response = client.get('/badge/DOI/value.svg')
+            assert response.status_code == 200
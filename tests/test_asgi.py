@@ -0,0 +1,110 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of Invenio.
+# Copyright (C) 2020 CERN.
+#
+# Invenio is free software; you can redistribute it and/or modify it
+# under the terms of the MIT License; see LICENSE file for more details.
+
+"""Test the ASGI badge application."""
+
+from __future__ import absolute_import, print_function
+
+import asyncio
+
+from invenio_formatter.asgi import BadgeASGIApp
+
+
+def request(asgi_app, path, method='GET', query_string=b'', headers=()):
+    """Send a request to the ASGI application."""
+    scope = {
+        'type': 'http',
+        'method': method,
+        'path': path,
+        'query_string': query_string,
+        'headers': [(name.encode('latin-1'), value.encode('latin-1'))
+                    for name, value in headers],
+    }
+    messages = []
+
+    async def receive():
+        return {'type': 'http.request', 'body': b''}
+
+    async def send(message):
+        messages.append(message)
+
+    async def call():
+        await asgi_app(scope, receive, send)
+        return messages
+
+    return call()
+
+
+def run(*requests):
+    """Run requests concurrently and get their status, headers and body."""
+    async def gather():
+        return await asyncio.gather(*requests)
+
+    responses = []
+    for start, body in asyncio.run(gather()):
+        responses.append((start['status'], dict(
+            (name.decode('latin-1'), value.decode('latin-1'))
+            for name, value in start['headers']), body['body']))
+    return responses
+
+
+def test_asgi_badge(app):
+    """Test badges served by the ASGI application."""
+    asgi_app = BadgeASGIApp(app)
+    with app.test_client() as client:
+        expected = client.get('/badge/DOI/value.svg')
+
+    [(status, headers, body)] = run(request(asgi_app, '/badge/DOI/value.svg'))
+    assert status == 200
+    assert body == expected.data
+    assert headers['content-type'] == expected.headers['Content-Type']
+    assert headers['etag'] == expected.headers['ETag']
+
+    [(status, headers, body)] = run(request(
+        asgi_app, '/badge/DOI/value.svg',
+        headers=[('If-None-Match', headers['etag'])]))
+    assert status == 304
+    assert body == b''
+
+    [(status, _, body)] = run(request(
+        asgi_app, '/badges.svg', query_string=b'badge=DOI/value'))
+    assert status == 200
+    assert body.startswith(b'<svg')
+
+    assert run(request(asgi_app, '/badge/DOI/value.txt'))[0][0] == 404
+    assert run(request(asgi_app, '/other'))[0][0] == 404
+
+
+def test_asgi_shared_rendering(app):
+    """Test concurrent identical requests share one rendering."""
+    asgi_app = BadgeASGIApp(app)
+    responses = run(*[request(asgi_app, '/badge/DOI/value.png')
+                      for _ in range(5)])
+    assert asgi_app.renders == 1
+    assert asgi_app.shared == 4
+    assert len(set(body for _, _, body in responses)) == 1
+
+    run(request(asgi_app, '/badge/DOI/value.png'),
+        request(asgi_app, '/badge/DOI/value.png',
+                headers=[('Accept-Encoding', 'gzip')]))
+    assert asgi_app.renders == 3
+
+
+def test_asgi_lifespan(app):
+    """Test the lifespan protocol."""
+    messages = [{'type': 'lifespan.startup'}, {'type': 'lifespan.shutdown'}]
+    sent = []
+
+    async def receive():
+        return messages.pop(0)
+
+    async def send(message):
+        sent.append(message['type'])
+
+    asyncio.run(BadgeASGIApp(app)({'type': 'lifespan'}, receive, send))
+    assert sent == ['lifespan.startup.complete', 'lifespan.shutdown.complete']
@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of Invenio.
+# Copyright (C) 2020 CERN.
+#
+# Invenio is free software; you can redistribute it and/or modify it
+# under the terms of the MIT License; see LICENSE file for more details.
+
+"""Tests for in-process caches."""
+
+from __future__ import absolute_import, print_function
+
+import time
+from threading import Event, Thread
+
+import pytest
+
+from invenio_formatter.cache import LRUCache, SingleFlight
+
+
+def test_lru_cache_entries():
+    """Test the cache is bounded in entries."""
+    cache = LRUCache(max_entries=2)
+    cache.set('a', 'A')
+    cache.set('b', 'B')
+    assert cache.get('a') == 'A'
+    cache.set('c', 'C')
+    # "b" was the least recently used entry.
+    assert 'b' not in cache
+    assert cache.get('a') == 'A'
+    assert cache.get('c') == 'C'
+    assert cache.get('b') is None
+    assert cache.stats == dict(
+        entries=2, bytes=2, hits=3, misses=1, evictions=1)
+
+
+def test_lru_cache_bytes():
+    """Test the cache is bounded in size."""
+    cache = LRUCache(max_entries=10, max_bytes=10)
+    cache.set('a', b'1234')
+    cache.set('b', b'1234')
+    assert cache.size == 8
+    cache.set('c', b'1234')
+    assert 'a' not in cache
+    assert cache.size == 8
+    # Entries larger than the cache are not stored.
+    cache.set('d', b'12345678901')
+    assert 'd' not in cache
+    assert len(cache) == 2
+    # Replacing an entry updates the size.
+    cache.set('c', b'1')
+    assert cache.size == 5
+    # Strings are measured in UTF-8 bytes.
+    cache.set('e', u'\u00e9')
+    assert cache.size == 7
+
+
+def test_lru_cache_get_or_set():
+    """Test values are computed once."""
+    calls = []
+
+    def factory():
+        calls.append(1)
+        return 'value'
+
+    cache = LRUCache()
+    assert cache.get_or_set('key', factory) == 'value'
+    assert cache.get_or_set('key', factory) == 'value'
+    assert len(calls) == 1
+
+    cache.clear()
+    assert cache.stats['entries'] == cache.stats['hits'] == 0
+
+    disabled = LRUCache(max_entries=0)
+    disabled.get_or_set('key', factory)
+    disabled.get_or_set('key', factory)
+    assert len(calls) == 3
+
+
+def test_single_flight():
+    """Test concurrent calls with the same key are coalesced."""
+    flights = SingleFlight()
+    started, release = Event(), Event()
+    calls = []
+
+    def render():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return 'badge'
+
+    results = []
+    leader = Thread(target=lambda: results.append(flights.do('a', render)))
+    leader.start()
+    started.wait(5)
+    followers = [
+        Thread(target=lambda: results.append(flights.do('a', render)))
+        for _ in range(3)
+    ]
+    for thread in followers:
+        thread.start()
+    while flights.stats['shared'] < 3:
+        time.sleep(0.001)
+    release.set()
+    for thread in [leader] + followers:
+        thread.join()
+    assert results == ['badge'] * 4
+    assert len(calls) == 1
+    assert flights.stats == dict(calls=1, shared=3)
+
+    # Errors are raised, and nothing stays in flight.
+    with pytest.raises(ZeroDivisionError):
+        flights.do('b', lambda: 1 / 0)
+    assert flights.do('b', lambda: 'ok') == 'ok'
@@ -0,0 +1,63 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of Invenio.
+# Copyright (C) 2020 CERN.
+#
+# Invenio is free software; you can redistribute it and/or modify it
+# under the terms of the MIT License; see LICENSE file for more details.
+
+"""Tests for the command line interface."""
+
+from __future__ import absolute_import, print_function
+
+import gzip
+
+from invenio_formatter.cli import formatter
+from invenio_formatter.context_processors.badges import generate_badge_svg
+
+
+def test_badges_warm(app):
+    """Test warming the badge caches."""
+    runner = app.test_cli_runner()
+    cache = app.extensions['invenio-formatter'].badge_cache
+    result = runner.invoke(
+        formatter, ['badges', 'warm', '-', '-j', '2'],
+        input='DOI/10.1234/a\n\n# comment\nDOI/10.1234/b\n')
+    assert result.exit_code == 0, result.output
+    assert 'Rendered 4 badges' in result.output
+    assert ('DOI', '10.1234/a', '#007ec6', 'svg') in cache
+    assert ('DOI', '10.1234/b', '#007ec6', 'png') in cache
+
+    result = runner.invoke(
+        formatter, ['badges', 'warm', '-f', 'svg'],
+        input='DOI/10.1234/c\nISBN/123\n')
+    assert result.exit_code == 1
+    assert 'Invalid badge: ISBN/123' in result.output
+    assert ('DOI', '10.1234/c', '#007ec6', 'svg') in cache
+    assert ('DOI', '10.1234/c', '#007ec6', 'png') not in cache
+
+
+def test_badges_export(app, tmpdir):
+    """Test exporting badges as static files."""
+    runner = app.test_cli_runner()
+    destination = str(tmpdir)
+    args = ['badges', 'export', destination, '-', '-j', '2', '-c', 'gz']
+    result = runner.invoke(formatter, args, input='DOI/10.1234/a\n')
+    assert result.exit_code == 0, result.output
+    assert '3 files written, 0 unchanged' in result.output
+
+    svg = tmpdir.join('badge', 'DOI', '10.1234', 'a.svg')
+    with app.app_context():
+        assert svg.read() == generate_badge_svg('DOI', '10.1234/a')
+    assert gzip.decompress(
+        tmpdir.join('badge', 'DOI', '10.1234', 'a.svg.gz').read_binary()) \
+        == svg.read_binary()
+    assert tmpdir.join('badge', 'DOI', '10.1234', 'a.png').check()
+
+    # Unchanged files are not written again.
+    result = runner.invoke(formatter, args, input='DOI/10.1234/a\n')
+    assert '0 files written, 3 unchanged' in result.output
+
+    result = runner.invoke(formatter, args, input='DOI/../../../etc\n')
+    assert result.exit_code == 1
+    assert 'Invalid badge: DOI/../../../etc' in result.output
@@ -15,7 +15,12 @@ from datetime import date, datetime
 import arrow
 import pytest
 from arrow.parser import ParserError
-from flask import render_template_string
+from dateutil import tz
+from flask import Flask, render_template_string
+
+from invenio_formatter import InvenioFormatter
+from invenio_formatter.filters.datetime import compile_arrow_format, \
+    format_arrow, from_isodate, from_isodatetime
 
 
 def test_from_isodate(app):
@@ -91,3 +96,112 @@ def test_sanitize_html(app, malicious_html, sanitized_html):
         assert render_template_string(
             "{{ content | sanitize_html() }}",
             content=malicious_html) == sanitized_html
+
+
+@pytest.mark.parametrize('value', [
+    '2020-06-01',
+    '2020-06-01T12:34',
+    '2020-06-01T12:34:56',
+    '2020-06-01 12:34:56',
+    '2020-06-01T12:34:56.7',
+    '2020-06-01T12:34:56.123456',
+    '2020-06-01T12:34:56Z',
+    '2020-06-01T12:34:56+00:00',
+    '2020-06-01T12:34:56+02:00',
+    '2020-06-01T23:34:56-0230',
+    '2020-02-29T00:00:00',
+    # Parsed by arrow.
+    '2020-06-01T12:34:56.1234567',
+    '2020-06-01T24:00:00',
+    '2020-06-01T12',
+    '20200601',
+    '2020-06',
+])
+def test_from_isodate_fast_path(value):
+    """Test the ISO 8601 parser gives the same results as arrow."""
+    expected = arrow.get(value).datetime
+    parsed = from_isodatetime(value)
+    assert parsed == expected
+    assert parsed.utcoffset() == expected.utcoffset()
+    assert str(parsed) == str(expected)
+    assert from_isodate(value) == arrow.get(value).date()
+
+
+@pytest.mark.parametrize('value', [
+    '2020-13-01', '2020-02-30', '2020-06-01T12:60', 'not a date'])
+def test_from_isodate_fast_path_errors(value):
+    """Test invalid values raise the errors of arrow."""
+    with pytest.raises(Exception) as expected:
+        arrow.get(value)
+    with pytest.raises(expected.type):
+        from_isodatetime(value)
+    with pytest.raises(expected.type):
+        from_isodate(value)
+
+
+@pytest.mark.parametrize('format_string', [
+    'YYYY/MM/DD',
+    'YYYY-MM-DD HH:mm:ss',
+    'YYYY-MM-DDTHH:mm:ss.SSSSSSZZ',
+    'D.M.YYYY H:m:s Z',
+    '[Year] YYYY {0} {{MM}} [{1}]',
+    '',
+    # Formatted by arrow.
+    'MMMM Do, YYYY',
+    'YYY',
+    'X',
+])
+@pytest.mark.parametrize('value', [
+    datetime(2020, 6, 1, 12, 34, 56, 789000, tz.tzoffset(None, 7200)),
+    datetime(42, 1, 2, 3, 4, 5, tzinfo=tz.tzutc()),
+    datetime(2020, 12, 31, 23, 59, 59, 1, tz.tzoffset(None, -9000)),
+    datetime(2020, 6, 1, tzinfo=tz.tzoffset(None, -1)),
+])
+def test_format_arrow(format_string, value):
+    """Test the compiled format strings give the same results as arrow."""
+    value = arrow.get(value)
+    assert format_arrow(value, format_string) == value.format(format_string)
+
+
+def test_compile_arrow_format():
+    """Test the compilation of the format strings."""
+    assert compile_arrow_format('YYYY/MM/DD') is \
+        compile_arrow_format('YYYY/MM/DD')
+    assert compile_arrow_format('YYYY/MM/DD')(datetime(2020, 6, 1)) == \
+        '2020/06/01'
+    assert compile_arrow_format('MMMM') is None
+
+
+def test_date_filters_cache():
+    """Test the memoized date filters."""
+    assert InvenioFormatter(Flask('testapp')).date_cache is None
+
+    app = Flask('testapp')
+    app.config['FORMATTER_DATES_CACHE_MAX_ENTRIES'] = 3
+    cache = InvenioFormatter(app).date_cache
+    template = "{{ dt|from_isodate }} {{ dt|from_isodatetime }} " \
+        "{{ dt|to_arrow }}"
+    with app.test_request_context():
+        html = render_template_string(template, dt='2002-01-01T10:00')
+        assert html == '2002-01-01 2002-01-01 10:00:00+00:00 ' \
+            '2002-01-01T10:00:00+00:00'
+        assert cache.stats['misses'] == 3
+        assert render_template_string(template, dt='2002-01-01T10:00') == \
+            html
+        assert cache.stats['hits'] == 3
+        assert len(cache) == 3
+
+        # Empty values, strict calls and non-string values are not memoized.
+        assert render_template_string(
+            "{{ dt|from_isodate }}", dt='') == 'None'
+        assert render_template_string(
+            "{{ dt|from_isodate(true) }}", dt='2002-01-01') == '2002-01-01'
+        assert render_template_string(
+            "{{ dt|from_isodate }}", dt=datetime(2002, 1, 1)) == '2002-01-01'
+        assert cache.stats['hits'] == 3
+        assert cache.stats['misses'] == 3
+
+        filters = app.jinja_env.filters
+        assert filters['from_isodate']('2002-01-01') is \
+            filters['from_isodate']('2002-01-01')
+        assert len(cache) == 3
@@ -0,0 +1,47 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of Invenio.
+# Copyright (C) 2020 CERN.
+#
+# Invenio is free software; you can redistribute it and/or modify it
+# under the terms of the MIT License; see LICENSE file for more details.
+
+"""Tests for badge text measurement."""
+
+from __future__ import absolute_import, print_function
+
+import pytest
+
+from invenio_formatter.context_processors.badges import get_text_length
+from invenio_formatter.fonts import font_text_length, get_glyph_table, \
+    load_font
+
+
+@pytest.mark.parametrize('text', [
+    '', ' ', 'DOI', 'ISBN', 'To', 'f', 'j', '_h$ff', 'VAVAV',
+    '10.1234/zenodo.12345', 'this_is_the_title', '10.5281/zenodo.1034',
+])
+def test_glyph_table_measure(text):
+    """Test the glyph table gives the same width as Pillow."""
+    table = get_glyph_table('DejaVuSans', 11)
+    assert table.measure(text) == font_text_length(table.font, text)
+
+
+def test_glyph_table_fallback():
+    """Test strings outside the table are measured by Pillow."""
+    table = get_glyph_table('DejaVuSans', 11)
+    text = u'zenodo.ĳ€'
+    assert table.measure(text) == font_text_length(table.font, text)
+    assert table.measure(text) > table.measure('zenodo.')
+
+
+def test_get_text_length(app):
+    """Test the configured badge font is used."""
+    assert get_text_length('DOI', 'value') == (
+        font_text_length(load_font('DejaVuSans', 11), 'DOI'),
+        font_text_length(load_font('DejaVuSans', 11), 'value'),
+    )
+    with app.app_context():
+        default = get_text_length('DOI')
+        app.config['FORMATTER_BADGES_FONT'] = ('DejaVuSans', 22)
+        assert get_text_length('DOI')[0] > default[0]
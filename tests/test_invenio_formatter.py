@@ -37,7 +37,7 @@ def test_init():
 
 
 def test_badge_enable_disable():
-    """Test if badge is disabled if CairoSVG is not installed."""
+    """Test if badge is disabled if Pillow is not installed."""
     app = Flask('testapp')
     InvenioFormatter(app)
     assert app.config['FORMATTER_BADGES_ENABLE'] is True
@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of Invenio.
+# Copyright (C) 2020 CERN.
+#
+# Invenio is free software; you can redistribute it and/or modify it
+# under the terms of the MIT License; see LICENSE file for more details.
+
+"""Test the formatter metrics."""
+
+from __future__ import absolute_import, print_function
+
+from flask import Flask, render_template_string
+
+from invenio_formatter import InvenioFormatter
+from invenio_formatter.filters.html import sanitize_html
+from invenio_formatter.metrics import FormatterMetrics
+from invenio_formatter.signals import operation_measured
+
+
+def test_metrics_disabled(app):
+    """Test nothing is wrapped when the metrics are disabled."""
+    assert app.extensions['invenio-formatter'].metrics is None
+    assert app.jinja_env.filters['sanitize_html'] is sanitize_html
+    with app.test_client() as client:
+        assert client.get('/badges/metrics').status_code == 404
+
+
+def test_metrics_observe():
+    """Test the histograms and the Prometheus exposition."""
+    metrics = FormatterMetrics(caches=lambda: dict(memory=dict(hits=3)))
+    measured = []
+
+    def receiver(sender, **kwargs):
+        measured.append(kwargs)
+
+    with operation_measured.connected_to(receiver, sender=metrics):
+        metrics.observe('badge.view', 0.002, 100)
+        metrics.observe('badge.view', 0.2)
+    assert measured[0] == dict(
+        operation='badge.view', duration=0.002, size=100)
+    assert metrics.stats['badge.view']['count'] == 2
+    assert metrics.stats['badge.view']['bytes'] == 100
+
+    text = metrics.to_prometheus()
+    assert 'invenio_formatter_duration_seconds_bucket' \
+        '{operation="badge.view",le="0.001"} 0\n' in text
+    assert 'invenio_formatter_duration_seconds_bucket' \
+        '{operation="badge.view",le="0.0025"} 1\n' in text
+    assert 'invenio_formatter_duration_seconds_bucket' \
+        '{operation="badge.view",le="+Inf"} 2\n' in text
+    assert 'invenio_formatter_duration_seconds_count' \
+        '{operation="badge.view"} 2\n' in text
+    assert 'invenio_formatter_bytes_total{operation="badge.view"} 100\n' \
+        in text
+    assert 'invenio_formatter_cache_hits{cache="memory"} 3\n' in text
+
+
+def test_metrics_views():
+    """Test the filters, renders and views are measured."""
+    app = Flask('testapp')
+    app.config.update(
+        TESTING=True,
+        FORMATTER_METRICS_ENABLE=True,
+        FORMATTER_METRICS_ROUTE=True,
+    )
+    metrics = InvenioFormatter(app).metrics
+    with app.test_request_context():
+        assert render_template_string(
+            "{{ '<b>x</b>'|sanitize_html }}") == 'x'
+    with app.test_client() as client:
+        svg = client.get('/badge/DOI/value.svg')
+        client.get('/badge/DOI/value.svg')
+        stats = metrics.stats
+        assert stats['filter.sanitize_html']['count'] == 1
+        assert stats['badge.render.svg']['count'] == 1
+        assert stats['badge.view']['count'] == 2
+        assert stats['badge.view']['bytes'] == 2 * len(svg.data)
+
+        response = client.get('/badges/metrics')
+        assert response.mimetype == 'text/plain'
+        assert b'operation="badge.render.svg"' in response.data
+        assert b'invenio_formatter_cache_hits{cache="memory"} 1' in \
+            response.data
+        assert 'badge.view' in metrics.stats
+        assert metrics.stats['badge.view']['count'] == 2
@@ -0,0 +1,44 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of Invenio.
+# Copyright (C) 2020 CERN.
+#
+# Invenio is free software; you can redistribute it and/or modify it
+# under the terms of the MIT License; see LICENSE file for more details.
+
+"""Tests for the PNG render pool."""
+
+from __future__ import absolute_import, print_function
+
+from flask import Flask
+
+from invenio_formatter import InvenioFormatter
+from invenio_formatter.context_processors.badges import generate_badge_png
+from invenio_formatter.pool import RenderPool
+
+
+def test_render_pool_views():
+    """Test the badge view draws PNG badges in the pool."""
+    app = Flask('testapp')
+    app.config.update(
+        TESTING=True,
+        FORMATTER_BADGES_RENDER_WORKERS=1,
+        FORMATTER_BADGES_RENDER_TIMEOUT=60,
+    )
+    ext = InvenioFormatter(app)
+    try:
+        with app.test_client() as client:
+            response = client.get('/badge/DOI/value.png')
+        assert ext.render_pool.stats['submitted'] == 1
+        assert response.data == generate_badge_png('DOI', 'value')
+    finally:
+        ext.render_pool.shutdown()
+
+
+def test_render_pool_overflow():
+    """Test badges are not submitted when too many are pending."""
+    pool = RenderPool(1, ('DejaVuSans', 11), 'pillow', max_pending=1)
+    pool._slots.acquire()
+    assert pool.render_png('DOI', 'value', '#007ec6') is None
+    assert pool.stats['overflows'] == 1
+    assert pool.stats['submitted'] == 0
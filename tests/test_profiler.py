@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of Invenio.
+# Copyright (C) 2020 CERN.
+#
+# Invenio is free software; you can redistribute it and/or modify it
+# under the terms of the MIT License; see LICENSE file for more details.
+
+"""Test the template profiler."""
+
+from __future__ import absolute_import, print_function
+
+import json
+
+from flask import Flask, render_template_string
+
+from invenio_formatter import InvenioFormatter
+from invenio_formatter.cli import formatter
+
+TEMPLATE = r"""
+{%- from "invenio_formatter/macros/meta.html" import meta_opengraph %}
+{%- macro outer(value) %}[{{ value|sanitize_html }}]{% endmacro %}
+{{- meta_opengraph("TITLE", "DESC") }}{{ outer('<b>a</b>') }}
+{{- outer('<i>b</i>') }}
+"""
+
+
+def create_app(tmpdir, **config):
+    """Create an application with the profiler."""
+    app = Flask('testapp')
+    app.config.update(
+        TESTING=True,
+        FORMATTER_PROFILER_ENABLE=True,
+        FORMATTER_PROFILER_LOG=str(tmpdir.join('profile.log')),
+        **config
+    )
+    InvenioFormatter(app)
+
+    @app.route('/')
+    def index():
+        return render_template_string(TEMPLATE)
+    return app
+
+
+def test_profiler(tmpdir):
+    """Test the macros and filters are profiled."""
+    app = create_app(tmpdir)
+    with app.test_client() as client:
+        response = client.get('/')
+        assert response.data.endswith(b'[a][b]')
+        timing = response.headers['Server-Timing']
+        assert 'macro.outer;dur=' in timing
+        assert 'desc="2 calls"' in timing
+        assert 'macro.meta_opengraph;' in timing
+        assert 'filter.sanitize_html;' in timing
+        client.get('/')
+
+    with open(app.config['FORMATTER_PROFILER_LOG']) as fp:
+        profiles = [json.loads(line) for line in fp]
+    assert len(profiles) == 2
+    assert profiles[0]['path'] == '/'
+    assert profiles[0]['timings']['macro.outer'][0] == 2
+    assert profiles[0]['timings']['filter.sanitize_html'][0] == 2
+
+    result = app.test_cli_runner().invoke(
+        formatter, ['profile', 'report', app.config['FORMATTER_PROFILER_LOG']])
+    assert result.exit_code == 0, result.output
+    assert '2 requests' in result.output
+    lines = result.output.splitlines()
+    assert any(line.startswith('macro.outer') and ' 2 ' in line and
+               ' 4 ' in line for line in lines)
+
+
+def test_profiler_sampling(tmpdir):
+    """Test requests outside of the sample are not profiled."""
+    app = create_app(tmpdir, FORMATTER_PROFILER_SAMPLE_RATE=0)
+    with app.test_client() as client:
+        response = client.get('/')
+        assert response.data.endswith(b'[a][b]')
+        assert 'Server-Timing' not in response.headers
+    with app.test_request_context():
+        assert render_template_string(TEMPLATE).endswith('[a][b]')
@@ -0,0 +1,120 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of Invenio.
+# Copyright (C) 2020 CERN.
+#
+# Invenio is free software; you can redistribute it and/or modify it
+# under the terms of the MIT License; see LICENSE file for more details.
+
+"""Tests for the shared badge store."""
+
+from __future__ import absolute_import, print_function
+
+import os
+import subprocess
+import sys
+from zlib import crc32
+
+from flask import Flask
+
+from invenio_formatter import InvenioFormatter
+from invenio_formatter.store import RENDER_LOCK_SLOTS, BadgeStore
+
+
+def test_badge_store(tmpdir):
+    """Test storing and reading badges."""
+    path = str(tmpdir.join('store', 'badges.store'))
+    store = BadgeStore(path, capacity=4096)
+    assert store.get(('DOI', 'a', '#fff', 'svg')) is None
+    store.set(('DOI', 'a', '#fff', 'svg'), b'<svg>a</svg>')
+    assert store.get(('DOI', 'a', '#fff', 'svg')) == b'<svg>a</svg>'
+    assert os.path.getsize(path) == 4096
+
+    # Another worker sees the badges appended by the first one.
+    other = BadgeStore(path, capacity=4096)
+    assert other.get(('DOI', 'a', '#fff', 'svg')) == b'<svg>a</svg>'
+    other.set(('DOI', 'b', '#fff', 'svg'), b'<svg>b</svg>')
+    assert store.get(('DOI', 'b', '#fff', 'svg')) == b'<svg>b</svg>'
+    assert store.stats['entries'] == 2
+
+    store.clear()
+    assert other.get(('DOI', 'a', '#fff', 'svg')) is None
+
+
+def test_badge_store_compaction(tmpdir):
+    """Test the store keeps the most recent badges when full."""
+    path = str(tmpdir.join('badges.store'))
+    store = BadgeStore(path, capacity=1024)
+    for i in range(20):
+        store.set(('DOI', str(i), '#fff', 'png'), b'x' * 100)
+    assert store.stats['compactions'] > 0
+    assert store.get(('DOI', '19', '#fff', 'png')) == b'x' * 100
+    assert store.get(('DOI', '0', '#fff', 'png')) is None
+    assert store.stats['bytes'] <= 1024
+
+    # Values larger than the store are ignored.
+    store.set(('DOI', 'big', '#fff', 'png'), b'x' * 2048)
+    assert store.get(('DOI', 'big', '#fff', 'png')) is None
+
+
+def test_badge_store_views(tmpdir):
+    """Test the badge view fills the store."""
+    app = Flask('testapp', instance_path=str(tmpdir))
+    app.config.update(
+        TESTING=True,
+        FORMATTER_BADGES_STORE_ENABLE=True,
+        FORMATTER_BADGES_CACHE_MAX_ENTRIES=0,
+    )
+    ext = InvenioFormatter(app)
+    with app.test_client() as client:
+        first = client.get('/badge/DOI/value.svg')
+        assert ext.badge_store.stats['misses'] == 1
+        second = client.get('/badge/DOI/value.svg')
+        assert ext.badge_store.stats['hits'] == 1
+        assert first.data == second.data
+    assert os.path.exists(str(tmpdir.join('badges.store')))
+
+
+def test_badge_store_namespace_and_capacity(tmpdir):
+    """Test the store is discarded only when its namespace changes."""
+    path = str(tmpdir.join('badges.store'))
+    store = BadgeStore(path, capacity=4096, namespace='2:DejaVuSans:11')
+    store.set(('DOI', 'a', '#fff', 'svg'), b'<svg>a</svg>')
+
+    # A smaller capacity keeps using the existing file.
+    smaller = BadgeStore(path, capacity=1024, namespace='2:DejaVuSans:11')
+    assert smaller.get(('DOI', 'a', '#fff', 'svg')) == b'<svg>a</svg>'
+    assert os.path.getsize(path) == 4096
+
+    # Another renderer version or font discards the badges.
+    other = BadgeStore(path, capacity=4096, namespace='3:DejaVuSans:11')
+    assert other.get(('DOI', 'a', '#fff', 'svg')) is None
+
+
+def test_badge_store_render_lock(tmpdir):
+    """Test the render locks exclude other processes."""
+    path = str(tmpdir.join('badges.store'))
+    key = ('DOI', 'a', '#fff', 'png')
+    script = (
+        'import fcntl, sys\n'
+        'fp = open(sys.argv[1], "a")\n'
+        'try:\n'
+        '    fcntl.lockf(fp.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB, 1,\n'
+        '                int(sys.argv[2]))\n'
+        'except OSError:\n'
+        '    sys.exit(1)\n'
+    )
+    slot = str(crc32(BadgeStore.encode_key(key)) % RENDER_LOCK_SLOTS)
+
+    def locked():
+        return subprocess.call(
+            [sys.executable, '-c', script, path + '.render.lock', slot]) == 1
+
+    store = BadgeStore(path, capacity=4096, render_locks=True)
+    with store.render_lock(key):
+        assert locked()
+    assert not locked()
+
+    # Without render locks, nothing is locked.
+    with BadgeStore(path, capacity=4096).render_lock(key):
+        assert not locked()
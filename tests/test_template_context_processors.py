@@ -10,7 +10,9 @@
 
 from __future__ import absolute_import, print_function
 
-from flask import render_template_string
+from flask import Flask, render_template_string
+
+from invenio_formatter.context_processors.badges import badges_processor
 
 
 def test_context_processor_badge_svg(app):
@@ -21,10 +23,22 @@ def test_context_processor_badge_svg(app):
     with app.test_request_context():
         html = render_template_string(template)
         html = html.replace('\n', '').replace(' ', '')
-        assert 'fill-opacity=".3">DOI</text>' in html
         assert 'y="14">DOI</text>' in html
-        assert 'fill-opacity=".3">10.1234/zenodo.12345</text>' in html
         assert 'y="14">10.1234/zenodo.12345</text>' in html
+        # The shadow reuses the text instead of repeating it.
+        assert html.count('>DOI</text>') == 1
+        assert html.count('<use') == 2
+        assert 'y="1"fill="#010101"fill-opacity=".3"/>' in html
+
+
+def test_context_processor_badge_svg_escaping(app):
+    """Test badge texts are escaped in the SVG."""
+    template = r"""
+    {{ badge_svg('DOI','10.1002/(SICI)<1>&')|safe }}
+    """
+    with app.test_request_context():
+        html = render_template_string(template)
+        assert '>10.1002/(SICI)&lt;1&gt;&amp;</text>' in html
 
 
 def test_context_processor_badge_png(app):
@@ -35,3 +49,79 @@ def test_context_processor_badge_png(app):
     with app.test_request_context():
         html = render_template_string(template)
         assert 'data:image/png;base64,' in html
+
+
+def test_context_processor_without_extension():
+    """Test the badge helpers work when the extension is not installed."""
+    app = Flask('testapp')
+    app.context_processor(badges_processor)
+    with app.test_request_context():
+        html = render_template_string("{{ badge_svg('DOI', 'value')|safe }}")
+        assert 'y="14">value</text>' in html
+
+
+def test_context_processor_badge_svg_font(app):
+    """Test the SVG uses the configured font."""
+    template = "{{ badge_svg('DOI', 'value')|safe }}"
+    with app.test_request_context():
+        html = render_template_string(template)
+        assert 'font-family="DejaVu Sans,Verdana' in html
+        assert 'font-size="11"' in html
+
+        app.config['FORMATTER_BADGES_FONT'] = ('DejaVuSerif', 12)
+        html = render_template_string(template.replace('value', 'other'))
+        assert 'font-family="DejaVu Serif,Verdana' in html
+        assert 'font-size="12"' in html
+
+
+def test_generate_badges(app):
+    """Test generating many badges at once."""
+    from invenio_formatter.context_processors.badges import \
+        generate_badge_png, generate_badge_svg, generate_badges
+
+    items = [('DOI', '10.1/a'), ('DOI', '10.1/b'), ('DOI', '10.1/a'),
+             ('ISBN', '123', '#fff')]
+    with app.app_context():
+        svgs = generate_badges(items)
+        assert svgs == [
+            generate_badge_svg('DOI', '10.1/a'),
+            generate_badge_svg('DOI', '10.1/b'),
+            generate_badge_svg('DOI', '10.1/a'),
+            generate_badge_svg('ISBN', '123', '#fff'),
+        ]
+        assert svgs[0] is svgs[2]
+        assert generate_badges(items[:1], fmt='png') == [
+            generate_badge_png('DOI', '10.1/a')]
+
+
+def test_context_processor_badges(app):
+    """Test context processor functions generating many badges."""
+    template = r"""
+    {%- for svg in badges_svg(pairs) %}{{ svg|safe }}{% endfor %}
+    {%- for png in badges_png(pairs) %}<img src="{{ png }}">{% endfor %}
+    """
+    with app.test_request_context():
+        html = render_template_string(
+            template, pairs=[('DOI', 'first'), ('DOI', 'second')])
+        assert html.index('>first</text>') < html.index('>second</text>')
+        assert html.count('src="data:image/png;base64,iVBOR') == 2
+
+
+def test_context_processor_datauris(app):
+    """Test the cached badge data URIs."""
+    template = r"""
+    <img src="{{ badge_png('DOI', 'value') }}">
+    <img src="{{ badge_svg_datauri('DOI', '10.1/<a>#b') }}">
+    """
+    cache = app.extensions['invenio-formatter'].badge_cache
+    with app.test_request_context():
+        assert badges_processor() is badges_processor()
+        html = render_template_string(template)
+        assert 'src="data:image/png;base64,iVBOR' in html
+        assert 'src="data:image/svg+xml,%3Csvg ' in html
+        assert '10.1/&amp;lt;a&amp;gt;%23b' in html
+        assert ('DOI', 'value', '#007ec6', 'png', 'datauri') in cache
+
+        misses = cache.stats['misses']
+        assert render_template_string(template) == html
+        assert cache.stats['misses'] == misses
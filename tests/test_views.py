@@ -10,7 +10,12 @@
 
 from __future__ import absolute_import, print_function
 
+import gzip
+from io import BytesIO
+
 from flask import Flask
+from mock import patch
+from PIL import Image
 
 from invenio_formatter import InvenioFormatter
 
@@ -22,10 +27,9 @@ def test_views_badge_svg(app):
             response = client.get('/badge/DOI/value.svg')
             response_data = response.get_data(as_text=True).replace(
                     '\n', '').replace(' ', '')
-            assert 'fill-opacity=".3">DOI</text>' in response_data
             assert 'y="14">DOI</text>' in response_data
-            assert 'fill-opacity=".3">value</text>' in response_data
             assert 'y="14">value</text>' in response_data
+            assert response_data.count('>value</text>') == 1
 
             # Unallowed title
             assert client.get('/badge/invalid/value.svg').status_code == 404
@@ -47,12 +51,12 @@ def test_views_badge_svg_mapping():
             response = client.get('/badge/test/value.svg')
             response_data = response.get_data(as_text=True).replace(
                     '\n', '').replace(' ', '')
-            assert 'fill-opacity=".3">TEST</text>' in response_data
+            assert 'y="14">TEST</text>' in response_data
 
             response = client.get('/badge/TEST/value.svg')
             response_data = response.get_data(as_text=True).replace(
                     '\n', '').replace(' ', '')
-            assert 'fill-opacity=".3">TEST</text>' in response_data
+            assert 'y="14">TEST</text>' in response_data
 
 
 def test_views_badge_png(app):
@@ -85,3 +89,201 @@ def test_views_badge_no_cache_headers(app):
             assert response.last_modified
             assert response.expires
             assert response.get_etag()[0]
+
+
+def test_views_badge_cache_policy(app):
+    """Test the public and immutable cache policies."""
+    app.config.update(
+        FORMATTER_BADGES_CACHE_POLICY='public',
+        FORMATTER_BADGES_MAX_CACHE_AGE=60,
+        FORMATTER_BADGES_SHARED_MAX_AGE=3600,
+        FORMATTER_BADGES_STALE_WHILE_REVALIDATE=30,
+    )
+    with app.test_client() as client:
+        response = client.get('/badge/DOI/value.svg')
+        assert 'Pragma' not in response.headers
+        assert response.cache_control.public
+        assert not response.cache_control.no_cache
+        assert response.cache_control.max_age == 60
+        assert response.cache_control.s_maxage == 3600
+        assert response.cache_control.stale_while_revalidate == 30
+        last_modified = response.headers['Last-Modified']
+        response = client.get('/badge/DOI/value.svg', headers={
+            'If-Modified-Since': last_modified})
+        assert response.status_code == 304
+
+        app.config['FORMATTER_BADGES_CACHE_POLICY'] = 'immutable'
+        response = client.get('/badge/DOI/value.svg')
+        assert response.cache_control.immutable
+        assert response.cache_control.max_age == 365 * 24 * 3600
+        assert response.headers['Last-Modified'] == last_modified
+
+
+def test_views_badge_cache(app):
+    """Test rendered badges are cached."""
+    cache = app.extensions['invenio-formatter'].badge_cache
+    with app.test_client() as client:
+        first = client.get('/badge/DOI/value.svg')
+        assert cache.stats['misses'] == 1
+        second = client.get('/badge/DOI/value.svg')
+        assert cache.stats['hits'] == 1
+        assert first.data == second.data
+        assert ('DOI', 'value', '#007ec6', 'svg') in cache
+
+
+def test_views_badge_png_pillow(app):
+    """Test PNG badges are drawn by Pillow."""
+    from io import BytesIO
+
+    from PIL import Image
+
+    from invenio_formatter.context_processors.badges import generate_badge_svg
+
+    with app.test_client() as client:
+        response = client.get('/badge/DOI/10.1234/zenodo.12345.png')
+        assert response.mimetype == 'image/png'
+        image = Image.open(BytesIO(response.data))
+        width = int(generate_badge_svg(
+            'DOI', '10.1234/zenodo.12345').split('width="')[1].split('"')[0])
+        assert image.size == (width, 20)
+        assert image.mode == 'RGBA'
+        # Rounded corners are transparent, the body is opaque.
+        assert image.getpixel((0, 0))[3] < 255
+        assert image.getpixel((10, 10))[3] == 255
+
+
+def test_views_badges_sprite():
+    """Test the badge sprite endpoint."""
+    app = Flask('testapp')
+    app.config.update(
+        TESTING=True,
+        FORMATTER_BADGES_ALLOWED_TITLES=['DOI', 'doi'],
+        FORMATTER_BADGES_TITLE_MAPPING={'doi': 'DOI'},
+        FORMATTER_BADGES_SPRITE_MAX_BADGES=3,
+    )
+    InvenioFormatter(app)
+
+    with app.test_client() as client:
+        url = '/badges.svg?badge=DOI/10.1234/a&badge=doi/10.1234/b'
+        response = client.get(url)
+        assert response.mimetype == 'image/svg+xml'
+        data = response.get_data(as_text=True)
+        assert 'height="40"' in data
+        assert '<view id="badge-0" viewBox="0 0 ' in data
+        assert '<view id="badge-1" viewBox="0 20 ' in data
+        assert data.index('>10.1234/a</text>') < \
+            data.index('>10.1234/b</text>')
+        assert '>doi</text>' not in data
+
+        response = client.get(
+            url, headers={'If-None-Match': response.headers['ETag']})
+        assert response.status_code == 304
+
+        response = client.get(url.replace('.svg', '.png'))
+        assert response.mimetype == 'image/png'
+        assert b'\x89PNG\r\n' in response.data
+
+        assert client.get('/badges.svg').status_code == 400
+        assert client.get('/badges.svg?badge=ISBN/1').status_code == 400
+        assert client.get('/badges.svg?badge=DOI/').status_code == 400
+        assert client.get(
+            '/badges.svg?' + '&'.join(['badge=DOI/1'] * 4)).status_code == 400
+
+
+def test_views_badge_conditional_without_rendering(app):
+    """Test 304 and HEAD responses do not render the badge."""
+    with app.test_client() as client:
+        etag = client.get('/badge/DOI/value.svg').headers['ETag']
+        assert etag != client.get('/badge/DOI/value.png').headers['ETag']
+
+        with patch('invenio_formatter.context_processors.badges.'
+                   'render_badge') as render:
+            response = client.get('/badge/DOI/value.svg',
+                                  headers={'If-None-Match': etag})
+            assert response.status_code == 304
+            response = client.head('/badge/DOI/other.svg')
+            assert response.status_code == 200
+            assert response.headers['ETag']
+            assert response.mimetype == 'image/svg+xml'
+            assert not render.called
+
+
+def test_views_badge_content_encoding(app):
+    """Test the negotiation of compressed badges."""
+    cache = app.extensions['invenio-formatter'].badge_cache
+    with app.test_client() as client:
+        plain = client.get('/badge/DOI/value.svg')
+        assert plain.content_encoding is None
+        assert 'Accept-Encoding' in plain.vary
+
+        with patch('invenio_formatter.context_processors.badges.brotli',
+                   None):
+            response = client.get('/badge/DOI/value.svg', headers={
+                'Accept-Encoding': 'br, gzip'})
+            assert response.content_encoding == 'gzip'
+            assert 'Accept-Encoding' in response.vary
+            assert gzip.decompress(response.data) == plain.data
+            assert response.get_etag()[0] != plain.get_etag()[0]
+            assert ('DOI', 'value', '#007ec6', 'svg', 'gzip') in cache
+
+            response = client.get('/badge/DOI/value.svg', headers={
+                'Accept-Encoding': 'gzip',
+                'If-None-Match': response.headers['ETag']})
+            assert response.status_code == 304
+            assert 'Accept-Encoding' in response.vary
+
+        response = client.get('/badges.svg?badge=DOI/value', headers={
+            'Accept-Encoding': 'gzip'})
+        assert response.content_encoding == 'gzip'
+        assert gzip.decompress(response.data).startswith(b'<svg')
+
+        app.config['FORMATTER_BADGES_ENCODINGS'] = []
+        response = client.get('/badge/DOI/value.svg', headers={
+            'Accept-Encoding': 'gzip'})
+        assert response.content_encoding is None
+        assert 'Accept-Encoding' not in response.vary
+
+        response = client.get('/badge/DOI/value.png', headers={
+            'Accept-Encoding': 'gzip'})
+        assert response.content_encoding is None
+
+
+def test_views_badge_webp_and_scale(app):
+    """Test WebP and scaled badges."""
+    cache = app.extensions['invenio-formatter'].badge_cache
+    with app.test_client() as client:
+        png = client.get('/badge/DOI/value.png')
+        assert png.mimetype == 'image/png'
+        assert 'Accept' in png.vary
+        width, height = Image.open(BytesIO(png.data)).size
+
+        response = client.get('/badge/DOI/value@2x.png')
+        assert response.mimetype == 'image/png'
+        assert Image.open(BytesIO(response.data)).size == \
+            (2 * width, 2 * height)
+        assert ('DOI', 'value', '#007ec6', 'png@2x') in cache
+
+        webp = client.get('/badge/DOI/value.png', headers={
+            'Accept': 'image/webp,*/*'})
+        assert webp.mimetype == 'image/webp'
+        assert webp.data[8:12] == b'WEBP'
+        assert len(webp.data) < len(png.data)
+        assert webp.get_etag()[0] != png.get_etag()[0]
+        assert client.get('/badge/DOI/value.png', headers={
+            'Accept': '*/*'}).mimetype == 'image/png'
+
+        response = client.get('/badge/DOI/value@3x.webp')
+        assert response.mimetype == 'image/webp'
+        assert 'Accept' not in response.vary
+        assert Image.open(BytesIO(response.data)).size == \
+            (3 * width, 3 * height)
+
+        assert client.get('/badge/DOI/value@9x.png').status_code == 404
+        assert b'>value@2x</text>' in client.get(
+            '/badge/DOI/value@2x.svg').data
+
+        app.config['FORMATTER_BADGES_NEGOTIATE_WEBP'] = False
+        response = client.get('/badge/DOI/value.png', headers={
+            'Accept': 'image/webp'})
+        assert response.mimetype == 'image/png'
+        assert 'Accept' not in response.vary